@@ -0,0 +1,220 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import game_types as gt
+import tempfile
+import datetime
+import winrate
+import shutil
+import glicko_period
+import gaussian
+import glicko2
+import glicko
+import random
+import json
+import main as mn
+import time
+import glob
+import sys
+import elo
+import csv
+import os
+
+SYSTEMS = {
+    'elo': elo,
+    'glicko': glicko,
+    'glicko_period': glicko_period,
+    'glicko2': glicko2,
+    'gaussian': gaussian,
+    'winrate': winrate
+}
+
+SCALES = (10, 100, 1000)
+
+# Size of the real data set, scaled by the benchmark
+BASE_PLAYERS = 280
+BASE_TOURNAMENTS = 90
+BASE_LEAGUES = 1
+
+CITIES = ('Msk', 'SPb', 'Ekb', 'Nsk', 'Kzn', 'NN')
+TYPES = ('LT', 'LT', 'LT', 'LT', 'GT', 'TC', 'GC')
+
+
+def generate_players(fname, n, rnd):
+    names = ['Player {}'.format(i) for i in range(n)]
+    with open(fname, 'w') as csvf:
+        wrt = csv.writer(csvf)
+        for name in names:
+            wrt.writerow((name, rnd.choice(CITIES), ''))
+
+    return names
+
+
+def generate_tournament(dirname, i, date, names, factions, rnd):
+    # Swiss tournament in the layout of tournaments/*.csv: players meet the
+    # closest opponent by score, an odd player sits at a table alone (bye).
+    players = rnd.sample(names, rnd.randint(8, 32))
+    tours = 3 if len(players) < 16 else 5
+    skill = {p: rnd.gauss(0, 1) for p in players}
+    faction = {p: rnd.choice(factions) for p in players}
+    score = {p: 0 for p in players}
+    cols = {p: [] for p in players}
+    for _ in range(tours):
+        order = sorted(players, key=lambda p: (-score[p], rnd.random()))
+        for t in range(0, len(order), 2):
+            table = order[t:t + 2]
+            if len(table) < 2:
+                cols[table[0]] += [t // 2 + 1, 3]
+                continue
+
+            p1, p2 = table
+            win = rnd.random() < 1 / (1 + 10**(skill[p2] - skill[p1]))
+            cols[p1] += [t // 2 + 1, 3 if win else 0]
+            cols[p2] += [t // 2 + 1, 0 if win else 3]
+            score[p1 if win else p2] += 1
+
+    fname = os.path.join(
+        dirname, '({}, {}, {}), \'Tournament {}\', \'Org\', \'{}\', \'{}\'.csv'.
+        format(date.year, date.month, date.day, i, rnd.choice(CITIES),
+               rnd.choice(TYPES)))
+    with open(fname, 'w') as csvf:
+        wrt = csv.writer(csvf)
+        wrt.writerow(['', 'Nick', 'Faction'] + ['T', 'VP'] * tours)
+        for j, p in enumerate(players):
+            wrt.writerow([j + 1, p, faction[p]] + cols[p])
+
+
+def generate_league(dirname, i, date, names, factions, rnd):
+    # League in the layout of leagues/*.csv: a player list, then one line
+    # per match with its own date.
+    players = rnd.sample(names, rnd.randint(12, 32))
+    fname = os.path.join(
+        dirname, '({}, {}, {}), \'League {}\', \'Org\', \'{}\'.csv'.format(
+            date.year, date.month, date.day, i, rnd.choice(CITIES)))
+    with open(fname, 'w') as csvf:
+        wrt = csv.writer(csvf)
+        wrt.writerow((len(players), ))
+        for j, p in enumerate(players):
+            wrt.writerow((j + 1, p, ''))
+
+        for _ in range(len(players) * 4):
+            p1, p2 = rnd.sample(range(1, len(players) + 1), 2)
+            d = date + datetime.timedelta(rnd.randint(0, 60))
+            wrt.writerow((p1, p2, d.year, d.month, d.day, '',
+                          rnd.choice(factions), rnd.choice(factions)))
+
+
+def generate(dirname, scale, seed=0):
+    rnd = random.Random(seed)
+    for sub in ('tournaments', 'leagues'):
+        os.makedirs(os.path.join(dirname, sub), exist_ok=True)
+
+    shutil.copy('factions.csv', os.path.join(dirname, 'factions.csv'))
+    with open('factions.csv', 'r') as csvf:
+        factions = [l[0] for l in csv.reader(csvf)]
+
+    names = generate_players(os.path.join(dirname, 'players.csv'),
+                             BASE_PLAYERS * scale, rnd)
+
+    start = datetime.date(2018, 1, 1)
+    for i in range(BASE_TOURNAMENTS * scale):
+        date = start + datetime.timedelta(rnd.randint(0, 3 * 365))
+        generate_tournament(os.path.join(dirname, 'tournaments'), i, date,
+                            names, factions, rnd)
+
+    for i in range(BASE_LEAGUES * scale):
+        date = start + datetime.timedelta(rnd.randint(0, 3 * 365))
+        generate_league(os.path.join(dirname, 'leagues'), i, date, names,
+                        factions, rnd)
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    res = func(*args, **kwargs)
+    return res, time.perf_counter() - start
+
+
+def run(dirname, scale, systems=SYSTEMS):
+    # Seconds spent in each stage: loading the CSVs, replaying and ranking
+    # with milestones match by match and in batch waves, and exporting a
+    # rating table from the same replay.
+    registry = gt.Registry(os.path.join(dirname, 'players.csv'),
+                           os.path.join(dirname, 'factions.csv'))
+    tournaments = gt.Tournaments()
+    _, seconds = timed(
+        tournaments.load_all,
+        sorted(glob.glob(os.path.join(dirname, 'tournaments/*.csv'))),
+        sorted(glob.glob(os.path.join(dirname, 'leagues/*.csv'))),
+        registry=registry)
+
+    info = {
+        'scale': scale,
+        'players': len(registry.players),
+        'events': len(tournaments),
+        'matches': sum(1 for t in tournaments for _ in t.iter_matches())
+    }
+    results = [dict(info, stage='load', system=None, batch=None,
+                    seconds=seconds)]
+
+    cur_date = max(t.date for t in tournaments)
+    milestones = mn.milestones(tournaments)
+    output = os.path.join(dirname, 'output')
+    os.makedirs(output, exist_ok=True)
+    for name, system in systems.items():
+        for batch in (False, True):
+            engine = gt.RatingEngine(tournaments, milestones, batch=batch)
+            _, seconds = timed(engine.rate_players,
+                               cur_date,
+                               registry.players,
+                               sep=milestones,
+                               system=system)
+            results.append(
+                dict(info,
+                     stage='rate',
+                     system=name,
+                     batch=batch,
+                     seconds=seconds,
+                     seconds_per_match=seconds / max(info['matches'], 1)))
+
+        _, seconds = timed(mn.export_rating,
+                           os.path.join(output, name + '.md'),
+                           'Benchmark',
+                           engine,
+                           registry.players,
+                           cur_date,
+                           with_milestones=True,
+                           with_city=True,
+                           system=system)
+        results.append(
+            dict(info, stage='export', system=name, batch=True,
+                 seconds=seconds))
+
+    return results
+
+
+def benchmark(scales=SCALES, systems=SYSTEMS, seed=0):
+    results = []
+    for scale in scales:
+        dirname = tempfile.mkdtemp(prefix='wu-benchmark-')
+        try:
+            generate(dirname, scale, seed)
+            for res in run(dirname, scale, systems):
+                print('{scale:>5}x {stage:<6} {system!s:<13} {batch!s:<5} '
+                      '{seconds:.3f}s'.format(**res),
+                      file=sys.stderr)
+                results.append(res)
+        finally:
+            shutil.rmtree(dirname)
+
+    return results
+
+
+def main():
+    # benchmark.py [scale ...] > results.json
+    scales = [int(s) for s in sys.argv[1:]] or SCALES
+    json.dump(benchmark(scales), sys.stdout, indent=2)
+    print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+import hashlib
+import pickle
+import os
+
+
+def file_hash(fname):
+    h = hashlib.sha1()
+    with open(fname, 'rb') as f:
+        h.update(f.read())
+
+    return h.hexdigest()
+
+
+class Checkpoints:
+    # A checkpoint is the rating state after a chronological prefix of
+    # events (tournaments and match dates of leagues). It is keyed by a hash
+    # chain over the source files and dates of that prefix, so changing an
+    # older tournament file changes the keys of all later checkpoints and
+    # they are never picked up again. The registry files and the code doing
+    # the replay are hashed into the start of the chain.
+    def __init__(self,
+                 path='.checkpoints',
+                 depends=('players.csv', 'factions.csv'),
+                 keep=256):
+        self._path = path
+        self._keep = keep
+
+        h = hashlib.sha1()
+        for fname in depends:
+            h.update(file_hash(fname).encode())
+        self._base = h.hexdigest()
+
+        if not os.path.exists(path):
+            os.makedirs(path)
+
+        self._files = {}
+        for fname in os.listdir(path):
+            stem, ext = os.path.splitext(fname)
+            if ext == '.pickle':
+                self._files[stem.split('_')[-1]] = fname
+
+    def chain(self, events, system, with_factions, batch=False, code=()):
+        h = hashlib.sha1('{} {} {} {}'.format(self._base, system.__name__,
+                                              with_factions,
+                                              batch).encode())
+        for fname in code:
+            h.update(file_hash(fname).encode())
+        keys = [h.hexdigest()]
+        for date, tourney, _ in events:
+            if tourney.source_hash is None:
+                break
+
+            h = hashlib.sha1('{} {} {}'.format(keys[-1], tourney.source_hash,
+                                               date).encode())
+            keys.append(h.hexdigest())
+
+        return keys
+
+    def __contains__(self, key):
+        return key in self._files
+
+    def load(self, key):
+        if key not in self._files:
+            return None
+
+        fname = os.path.join(self._path, self._files[key])
+        try:
+            with open(fname, 'rb') as f:
+                state = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            del self._files[key]
+            return None
+
+        os.utime(fname)
+        return state
+
+    def save(self, key, date, ratings, faction_ratings):
+        if key in self._files:
+            return
+
+        fname = '{}_{}.pickle'.format(date.isoformat(), key)
+        tmp_fname = os.path.join(self._path, fname + '.tmp')
+        with open(tmp_fname, 'wb') as f:
+            pickle.dump((ratings, faction_ratings), f)
+        os.replace(tmp_fname, os.path.join(self._path, fname))
+        self._files[key] = fname
+
+        if len(self._files) > self._keep:
+            self._prune()
+
+    def _prune(self):
+        by_age = sorted(
+            self._files.items(),
+            key=lambda kf: os.path.getmtime(os.path.join(self._path, kf[1])))
+        for key, fname in by_age[:len(self._files) - self._keep]:
+            os.remove(os.path.join(self._path, fname))
+            del self._files[key]
@@ -1,4 +1,9 @@
+import numpy as np
+
+
 class Rating:
+    __slots__ = ('mu', 'n', 'last_active')
+
     def __init__(self, mu=1500.0, n=0, date=None):
         self.mu = mu
         self.n = n
@@ -23,3 +28,23 @@ def rate_2vs2(r1, r2, p1, p2, drawn=False, k=16, date=None):
     new_p1 = Rating(p1.mu + k * (s - e), p1.n + 1, date)
     new_p2 = Rating(p2.mu + k * (e - s), p2.n + 1, date)
     return (new_r1, new_r2, new_p1, new_p2)
+
+
+def rate_batch(ratings, p1, p2, drawn, date, k=32):
+    # rate_1vs1 over rows of a rating table, no row may appear twice in one
+    # call. date holds the ordinal of every match.
+    mu1 = ratings.mu[p1]
+    mu2 = ratings.mu[p2]
+    upd = k * (np.where(drawn, 0.5, 1.0) - 1.0 /
+               (1.0 + 10.0**((mu2 - mu1) / 400.0)))
+
+    ratings.mu[p1] = mu1 + upd
+    ratings.mu[p2] = mu2 - upd
+    ratings.n[p1] += 1
+    ratings.n[p2] += 1
+    ratings.last_active[p1] = date
+    ratings.last_active[p2] = date
+
+
+def expected(mu1, mu2, rd1Sq=None, rd2Sq=None):
+    return 1.0 / (1.0 + 10.0**((mu2 - mu1) / 400.0))
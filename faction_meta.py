@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import game_types as gt
+import manifest as mf
+import match_store
+import datetime
+import glicko
+import glob
+import elo
+import sys
+import os
+
+META_FNAME = 'output/faction-meta.md'
+
+SYSTEMS = {'elo': elo, 'glicko': glicko}
+
+
+def export_meta(fname, meta):
+    lines = [
+        '[К основным рейтингам](https://pee-kay.github.io/russian-wu-rating)',
+        '# Мета банд #\n',
+        '| # |{}|Rating  |Games |Score |'.format('Warband'.ljust(35)),
+        '|---|-----------------------------------|--------|------|------|'
+    ]
+
+    order = []
+    for pos, (faction, rating, games, score) in enumerate(meta.rows(), 1):
+        order.append(meta.factions.index(faction))
+        lines.append('|{:>3}|{:<35}|{:<8}|{:>6}|{:>5}%|'.format(
+            pos, faction, round(rating, 2), games, round(100 * score)))
+
+    # Score of the row warband against the column one, in percent
+    score = meta.score()
+    lines += [
+        '', '# Результаты банд друг против друга (%) #\n',
+        '| # |' + ''.join('{:>3}|'.format(j) for j in range(1,
+                                                            len(order) + 1)),
+        '|---|' + '---|' * len(order)
+    ]
+    for pos, i in enumerate(order, 1):
+        lines.append('|{:>3}|'.format(pos) + ''.join(
+            '   |' if meta.games[i, j] == 0 else '{:>3}|'.format(
+                round(100 * score[i, j])) for j in order))
+
+    lines.append(
+        '\n---\n\n[К основным рейтингам](https://pee-kay.github.io/russian-wu-rating)'
+    )
+
+    tmp_fname = fname + '.tmp'
+    with open(tmp_fname, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+    os.replace(tmp_fname, fname)
+
+
+def select(events, opts):
+    # Only the events passing --glass, --org=ORG, --city=CITY and
+    # --since=YYYY-MM-DD are opened
+    filters = dict(opt[2:].split('=', 1) for opt in opts if '=' in opt)
+    since = filters.get('since')
+    return events.select(
+        since=None if since is None else datetime.date.fromisoformat(since),
+        org=filters.get('org'),
+        city=filters.get('city'),
+        min_rank=2 if '--glass' in opts else None)
+
+
+def main():
+    # faction_meta.py [elo|glicko] [--glass] [--org=ORG] [--city=CITY]
+    #                 [--since=YYYY-MM-DD]
+    opts = [a for a in sys.argv[1:] if a.startswith('--')]
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    system = SYSTEMS[args[0] if args else 'elo']
+
+    registry = gt.Registry('players.csv', 'factions.csv')
+    events = select(
+        mf.Manifest.scan(sorted(glob.glob('tournaments/*.csv')),
+                         sorted(glob.glob('leagues/*.csv')),
+                         mf.MANIFEST_FNAME), opts)
+    tournaments = gt.Tournaments()
+    match_store.load(tournaments,
+                     events.tournament_fnames,
+                     events.league_fnames,
+                     registry=registry)
+
+    if not os.path.exists('output'):
+        os.mkdir('output')
+
+    meta = tournaments.faction_meta(system=system)
+    export_meta(META_FNAME, meta)
+    print('{} faction matchups of {} warbands exported to {}'.format(
+        len(meta), len(meta.factions), META_FNAME))
+
+
+if __name__ == '__main__':
+    main()
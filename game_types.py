@@ -1,5 +1,19 @@
+import concurrent.futures
+import checkpoints as cp
+import rating_table as rt
+import leaderboard as lb
+import profiling as pf
+import history as hs
+import numpy as np
+import functools
 import datetime
+import calendar
+import sys
 import winrate
+import difflib
+import bisect
+import heapq
+import ast
 import elo
 import csv
 import os
@@ -26,36 +40,76 @@ class Player:
 
     @staticmethod
     def create_players(*args):
-        players = {}
+        players = Players()
         for arg in args:
             if isinstance(arg, tuple):
                 player = Player(*arg)
             else:
                 player = Player(arg)
-            players[player.name] = player
+            players.add(player)
 
         return players
 
     @staticmethod
     def load_players(fname):
-        players = []
-        player_names = set()
+        players = Players()
 
         with open(fname, 'r') as csvf:
             rdr = csv.reader(csvf)
             for l in rdr:
-                if l[0] in player_names:
-                    raise RuntimeError('Player duplicate {}'.format(l))
-
                 hidden = False
                 if l[2].startswith('NONE'):
                     l[2] = l[2][4:]
                     hidden = True
 
-                players.append((l[0], l[1], l[0] if l[2] == '' else l[2], hidden))
-                player_names = player_names.union(set(l[0]))
+                players.add(
+                    Player(l[0], l[1], l[0] if l[2] == '' else l[2], hidden))
+
+        return players
+
+
+def normalize_name(name):
+    return ' '.join(name.split()).casefold()
+
+
+class Players(dict):
+    def __init__(self):
+        super().__init__()
+        self._aliases = {}
+
+    def add(self, player):
+        alias = normalize_name(player.name)
+        if alias in self._aliases:
+            raise RuntimeError('Player duplicate {} (already added as {})'.format(
+                repr(player.name), repr(self._aliases[alias].name)))
+
+        self[player.name] = player
+        self._aliases[alias] = player
+        return player
 
-        return Player.create_players(*players)
+    def resolve(self, name):
+        if name in self:
+            return self[name]
+
+        return self._aliases.get(normalize_name(name))
+
+    def suggest(self, name, n=3):
+        return [
+            self._aliases[alias].name for alias in difflib.get_close_matches(
+                normalize_name(name), self._aliases, n)
+        ]
+
+    def explain_missing(self, names):
+        res = []
+        for name in names:
+            suggestions = self.suggest(name)
+            if suggestions:
+                res.append('{} (did you mean {}?)'.format(
+                    repr(name), ' or '.join(map(repr, suggestions))))
+            else:
+                res.append(repr(name))
+
+        return 'Missing players: [{}]'.format(', '.join(res))
 
 
 class Faction:
@@ -82,6 +136,43 @@ class Faction:
         return factions
 
 
+class Registry:
+    _shared = {}
+
+    def __init__(self,
+                 players_fname='players.csv',
+                 factions_fname='factions.csv'):
+        self.players_fname = players_fname
+        self.factions_fname = factions_fname
+        self._cache = {}
+
+    @staticmethod
+    def shared(players_fname='players.csv', factions_fname='factions.csv'):
+        key = (players_fname, factions_fname)
+        if key not in Registry._shared:
+            Registry._shared[key] = Registry(players_fname, factions_fname)
+
+        return Registry._shared[key]
+
+    def _load(self, fname, loader):
+        st = os.stat(fname)
+        stamp = (st.st_mtime_ns, st.st_size)
+        cached = self._cache.get(fname)
+        if cached is None or cached[0] != stamp:
+            cached = (stamp, loader(fname))
+            self._cache[fname] = cached
+
+        return cached[1]
+
+    @property
+    def players(self):
+        return self._load(self.players_fname, Player.load_players)
+
+    @property
+    def factions(self):
+        return self._load(self.factions_fname, Faction.load_factions)
+
+
 class Tournament:
     def __init__(self, name, date, org, city, tt, players, factions={}):
         self._name = name
@@ -92,6 +183,8 @@ class Tournament:
         self._players = players
         self._factions = factions
         self._matches = [[]]
+        self.source_hash = None
+        self.on_date_change = None
 
     @property
     def name(self):
@@ -99,7 +192,7 @@ class Tournament:
 
     @property
     def date(self):
-        return datetime.date(self._date.year, self._date.month, self._date.day)
+        return self._date
 
     @property
     def org(self):
@@ -146,59 +239,25 @@ class Tournament:
 
         return False
 
-    def update_ratings(self, ratings, system, faction_ratings=None):
-        for tour in self._matches:
-            for p1, p2, drawn, f1, f2 in tour:
-                p1, p2 = self._players[p1], self._players[p2]
-                if p1 not in ratings:
-                    ratings[p1] = system.Rating()
-
-                if p2 not in ratings:
-                    ratings[p2] = system.Rating()
+    def update_ratings(self,
+                       ratings,
+                       system,
+                       faction_ratings=None,
+                       history=None):
+        rate_events(ratings, system, _tag_events(self), faction_ratings,
+                    history)
 
-                if faction_ratings != None and f1 != None and f2 != None and f1 != f2:
-                    if f1 not in faction_ratings:
-                        faction_ratings[f1] = system.Rating()
-
-                    if f2 not in faction_ratings:
-                        faction_ratings[f2] = system.Rating()
-
-                    ratings[p1], ratings[p2], faction_ratings[
-                        f1], faction_ratings[f2] = system.rate_2vs2(
-                            ratings[p1],
-                            ratings[p2],
-                            faction_ratings[f1],
-                            faction_ratings[f2],
-                            drawn,
-                            date=self.date)
-                else:
-                    ratings[p1], ratings[p2] = system.rate_1vs1(ratings[p1],
-                                                                ratings[p2],
-                                                                drawn,
-                                                                date=self.date)
-
-    def update_prob(self, ratings, prob, diff_step):
+    def iter_matches(self):
         for tour in self._matches:
-            for p1, p2, drawn, _, _ in tour:
-                p1, p2 = self._players[p1], self._players[p2]
-                r1, r2 = ratings[p1], ratings[p2]
-
-                diff = abs(r1.mu - r2.mu)
-                while diff >= prob[0][-1]:
-                    prob[0].append(prob[0][-1] + diff_step)
-                    prob[1].append(0)
-                    prob[2].append(0.0)
-
-                diff_i = 0
-                for i, bnd in enumerate(prob[0]):
-                    if bnd > diff:
-                        diff_i = i
-                        break
-
-                upd = 0.5 if drawn else (1 if r1.mu >= r2.mu else 0)
+            for p1, p2, drawn, f1, f2 in tour:
+                yield self._players[p1], self._players[p2], drawn, f1, f2
 
-                prob[1][diff_i] += 1
-                prob[2][diff_i] += upd
+    def iter_events(self):
+        # (date, tours) in date order. A tournament is played on a single
+        # date, so it is one event with all its tours.
+        yield self._date, [[(self._players[p1], self._players[p2], drawn, f1,
+                             f2) for p1, p2, drawn, f1, f2 in tour]
+                           for tour in self._matches if tour]
 
 
 class League(Tournament):
@@ -223,19 +282,54 @@ class League(Tournament):
 
         if date > self._date:
             self._date = date
+            if self.on_date_change is not None:
+                self.on_date_change()
+
+    def iter_events(self):
+        # Every match date of a league is an event of its own, matches of
+        # one date are rated in the order of the file.
+        days = {}
+        for tour, dates in zip(self._matches, self._match_dates):
+            for (p1, p2, drawn, f1, f2), date in zip(tour, dates):
+                days.setdefault(date, []).append(
+                    (self._players[p1], self._players[p2], drawn, f1, f2))
+
+        for date in sorted(days):
+            yield date, [days[date]]
 
 
 class Tournaments(list):
+    # The chronological order (tournaments in stable date order) is kept
+    # between calls. create()/create_league() and a league moving its date
+    # forward invalidate it.
+    _order = None
+
     def create(self, *args, **kwargs):
         tourney = Tournament(*args, **kwargs)
+        tourney.on_date_change = self.invalidate
         self.append(tourney)
+        self.invalidate()
         return tourney
 
     def create_league(self, *args, **kwargs):
         tourney = League(*args, **kwargs)
+        tourney.on_date_change = self.invalidate
         self.append(tourney)
+        self.invalidate()
         return tourney
 
+    def invalidate(self):
+        self._order = None
+
+    def chronological(self, tourney_check=None):
+        if self._order is None or len(self._order) != len(self):
+            self._order = sorted(self, key=lambda t: t.date)
+
+        if tourney_check is None:
+            return list(self._order)
+
+        return [t for t in self._order if tourney_check(t)]
+
     def rate_players(self,
                      cur_date,
                      players,
@@ -246,292 +340,957 @@ class Tournaments(list):
                      min_n=5,
                      filter_date=None,
                      max_rd_ratio=0.9,
-                     with_factions=False):
-        try:
-            r = system.Rating()
-            _ = r.rdSq
-            with_rd = True
-        except AttributeError:
-            with_rd = False
-
-        class State:
-            def __init__(self, with_factions):
-                self.ratings = {}
-                self.faction_ratings = {} if with_factions else None
-                self.result = []
-                self.prev_ids = {}
-                self.prev_faction_ids = {}
-
-            def separate(self, date):
-                self.result.append(([], []))
-
-                def check_rating(r):
-                    return r.getRdSq(
-                        date
-                    ) < system.MAX_RD_SQ * max_rd_ratio * max_rd_ratio if with_rd else r.n >= min_n or filter_date is None or date <= filter_date
-
-                ids = {}
-                if self.faction_ratings:
-                    for faction, r in sorted(
-                            self.faction_ratings.items(),
-                            key=lambda fr:
-                        (-fr[1].mu if check_rating(fr[1]) else 0, fr[0])):
-
-                        rating = r.mu if check_rating(r) else None
-
-                        if self.result[-1][1]:
-                            new = rating != self.result[-1][1][-1][2]
-                            position = len(
-                                self.result[-1]
-                                [1]) + 1 if new else self.result[-1][1][-1][0]
-                        else:
-                            new = True
-                            position = 1
-
-                        diff_p = None
-                        diff_r = None
-                        if faction in self.prev_faction_ids:
-                            prev_i = self.prev_faction_ids[faction]
-                            diff_p = self.result[-2][1][prev_i][0] - position
-                            if rating != None and self.result[-2][1][prev_i][
-                                    2] != None:
-                                diff_r = rating - self.result[-2][1][prev_i][2]
-
-                        ids[faction] = len(self.result[-1][1])
-                        self.result[-1][1].append(
-                            (position, faction, rating,
-                             r.getRdSq(date)**0.5 if with_rd else 0, diff_p,
-                             diff_r))
-
-                self.prev_faction_ids = ids
-
-                ids = {}
-                for p, r in sorted(
-                        self.ratings.items(),
-                        key=lambda pr:
-                    (-pr[1].mu
-                     if check_rating(pr[1]) else 0, players[pr[0]].display)):
-                    player = players[p]
-                    if player_check is not None and not player_check(player):
-                        continue
-
-                    if player.hidden:
-                        continue
-
-                    rating = r.mu if check_rating(r) else None
-
-                    if self.result[-1][0]:
-                        new = rating != self.result[-1][0][-1][2]
-                        position = len(
-                            self.result[-1]
-                            [0]) + 1 if new else self.result[-1][0][-1][0]
-                    else:
-                        new = True
-                        position = 1
-
-                    diff_p = None
-                    diff_r = None
-                    if player.name in self.prev_ids:
-                        prev_i = self.prev_ids[player.name]
-                        diff_p = self.result[-2][0][prev_i][0] - position
-                        if rating != None and self.result[-2][0][prev_i][
-                                2] != None:
-                            diff_r = rating - self.result[-2][0][prev_i][2]
-
-                    ids[player.name] = len(self.result[-1][0])
-                    self.result[-1][0].append(
-                        (position, player, rating,
-                         r.getRdSq(date)**0.5 if with_rd else 0, diff_p,
-                         diff_r))
-
-                self.prev_ids = ids
-
-        state = State(with_factions)
-        latest_date = None
-        for tourney in sorted(self, key=lambda t: t.date):
-            if tourney_check is not None and not tourney_check(tourney):
-                continue
-
-            while sep and tourney.date >= sep[0]:
-                state.separate(sep[0])
-                latest_date = sep[0]
-                sep = sep[1:]
-
-            tourney.update_ratings(state.ratings, system,
-                                   state.faction_ratings)
-
-            if player_check is None or tourney.check_players(
-                    players, player_check):
-                latest_date = tourney.date
-
-        while sep:
-            state.separate(sep[0])
-            latest_date = sep[0]
-            sep = sep[1:]
-
-        state.separate(cur_date if latest_date is None else latest_date)
-
-        return state.result, cur_date if latest_date is None else latest_date
-
-    def rate_prob(self, players, system=elo, diff_step=1):
-        ratings = {}
-
-        for tourney in sorted(self, key=lambda t: t.date):
-            tourney.update_ratings(ratings, system)
+                     with_factions=False,
+                     checkpoints=None,
+                     batch=True,
+                     history=None,
+                     window=None):
+        tourneys = self.chronological(tourney_check)
+        with pf.stage('replay', lambda: count_matches(tourneys), hot=True):
+            if window is None:
+                snapshots = replay(tourneys, system, sep, with_factions,
+                                   checkpoints, batch, history)
+            else:
+                snapshots = replay_window(tourneys, system, sep, window,
+                                          with_factions, checkpoints, batch)
+
+        with pf.stage('rank'):
+            return rank_players(snapshots, sep, tourneys, cur_date, players,
+                                player_check, system, min_n, filter_date,
+                                max_rd_ratio)
+
+    def rate_prob(self, players, system=elo, diff_step=1, batch=True):
+        ratings = replay(self.chronological(), system, batch=batch)[-1][0]
+
+        ids = {}
+        mu = []
+        rd_sq = []
+        for i, (p, r) in enumerate(ratings.items()):
+            ids[p] = i
+            mu.append(r.mu)
+            rd_sq.append(getattr(r, 'rdSq', 0.0))
+
+        p1 = []
+        p2 = []
+        drawn = []
+        for tourney in self:
+            for m in tourney.iter_matches():
+                p1.append(ids[m[0]])
+                p2.append(ids[m[1]])
+                drawn.append(m[2])
+
+        return Calibration(np.array(mu), np.array(rd_sq), np.array(p1, int),
+                           np.array(p2, int), np.array(drawn, bool), system,
+                           diff_step)
+
+    def faction_meta(self, tourney_check=None, system=elo):
+        return FactionMeta(self.chronological(tourney_check), system)
+
+    def add_record(self, record):
+        (kind, params, tourney_players, tourney_factions, matches,
+         source_hash) = record
+
+        date, name, org, city = params[:4]
+        if kind == 'league':
+            tourney = self.create_league(name, date, org, city,
+                                         tourney_players)
+            for p1, p2, date, f1, f2 in matches:
+                tourney.add_match(p1, p2, 1, datetime.date(*date), f1, f2)
+        else:
+            tourney = self.create(name, date, org, city, params[4],
+                                  tourney_players, tourney_factions)
+            for tour in matches:
+                for i1, i2, res in tour:
+                    tourney.add_match(i1, i2, res)
 
-        prob = [[diff_step], [0], [0.0]]
-        for tourney in sorted(self, key=lambda t: t.date):
-            tourney.update_prob(ratings, prob, diff_step)
+                tourney.end_current_tour()
 
-        return prob
+        tourney.source_hash = source_hash
+        return tourney
 
     def load_tournament(self,
                         fname,
                         players_fname='players.csv',
-                        factions_fname='factions.csv'):
-        tb_cols = []
-        vp_cols = []
-        nm_cols = []
-        fc_cols = []
-        tour_n = 0
-        players = []
-        factions = Faction.load_factions(factions_fname)
-        tables = set()
-        with open(fname, 'r') as csvf:
-            rdr = csv.reader(csvf)
-            for i, l in enumerate(rdr):
-                if i == 0:
-                    tb_cols = [
-                        i for i in range(len(l))
-                        if l[i] in ['t', 'T', 'TB', 'Tb', 'tb']
-                    ]
-                    vp_cols = [
-                        i for i in range(len(l))
-                        if l[i] in ['v', 'V', 'VP', 'Vp', 'vp']
-                    ]
-                    nm_cols = [
-                        i for i in range(len(l))
-                        if l[i] in ['N', 'Name', 'Nick']
-                    ]
-                    fc_cols = [
-                        i for i in range(len(l)) if l[i] in ['F', 'Faction']
-                    ]
-                    tour_n = len(tb_cols)
-                    if len(vp_cols) < tour_n or len(vp_cols) > (tour_n + 1):
-                        raise RuntimeError(
-                            'Wrong tournament caption {}'.format(l))
-                    continue
-
-                name = l[nm_cols[0] if nm_cols else 1].strip()
-                faction = None
-                if fc_cols:
-                    fc_key = l[fc_cols[0]].strip().lower()
-                    faction = factions[fc_key].name
-                tours = [(int(l[j]), int(l[k]))
-                         for j, k in zip(tb_cols, vp_cols[:tour_n])]
-                tables = tables.union(set([t[0] for t in tours]))
-                players.append((i, name, faction, tours))
-
-        tourney_factions = {}
-        tourney_players = {}
-        missing_players = []
-        existing_players = Player.load_players(players_fname)
-        for i, name, faction, _ in players:
-            if name not in existing_players and name != 'Proxy':
-                missing_players.append(name)
-
-            tourney_players[i] = name
-            if faction is not None:
-                tourney_factions[i] = faction
+                        factions_fname='factions.csv',
+                        registry=None):
+        if registry is None:
+            registry = Registry.shared(players_fname, factions_fname)
 
-        if missing_players:
-            raise RuntimeError('Missing players: {}'.format(missing_players))
+        return self.add_record(parse_tournament(fname, registry))
 
-        gl = {}
-        exec(
-            'params = ({})'.format(
-                os.path.splitext(os.path.basename(fname))[0]), gl)
-        date, name, org, city, tt = gl['params']
-        tourney = self.create(name, date, org, city, tt, tourney_players,
-                              tourney_factions)
+    def load_league(self,
+                    fname,
+                    players_fname='players.csv',
+                    factions_fname='factions.csv',
+                    registry=None):
+        if registry is None:
+            registry = Registry.shared(players_fname, factions_fname)
+
+        return self.add_record(parse_league(fname, registry))
+
+    def load_all(self,
+                 tournament_fnames=(),
+                 league_fnames=(),
+                 players_fname='players.csv',
+                 factions_fname='factions.csv',
+                 registry=None,
+                 workers=None):
+        # Records are merged in the order of the file lists, so tournaments
+        # of the same date are replayed exactly as with the serial loaders.
+        for record in parse_all(tournament_fnames, league_fnames,
+                                players_fname, factions_fname, registry,
+                                workers):
+            self.add_record(record)
+
+
+def parse_all(tournament_fnames=(),
+              league_fnames=(),
+              players_fname='players.csv',
+              factions_fname='factions.csv',
+              registry=None,
+              workers=None):
+    if registry is None:
+        registry = Registry.shared(players_fname, factions_fname)
+
+    jobs = [(parse_tournament, fname) for fname in tournament_fnames]
+    jobs += [(parse_league, fname) for fname in league_fnames]
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if workers == 1 or len(jobs) < 2:
+        return [parse(fname, registry) for parse, fname in jobs]
+
+    jobs = [(parse, fname, registry.players_fname, registry.factions_fname)
+            for parse, fname in jobs]
+    with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        return list(
+            executor.map(_parse_job,
+                         jobs,
+                         chunksize=max(1, len(jobs) // (workers * 4))))
+
+
+def _parse_job(job):
+    parse, fname, players_fname, factions_fname = job
+    return parse(fname, Registry.shared(players_fname, factions_fname))
+
+
+@functools.lru_cache(maxsize=None)
+def parse_metadata(fname, league=False):
+    # File names are tuple literals: (date), name, org, city[, type]
+    stem = os.path.splitext(os.path.basename(fname))[0]
+    try:
+        params = ast.literal_eval('({})'.format(stem))
+    except (ValueError, SyntaxError, MemoryError, RecursionError):
+        params = None
+
+    if not (isinstance(params, tuple) and len(params) == (4 if league else 5)
+            and isinstance(params[0], tuple) and len(params[0]) == 3
+            and all(isinstance(x, int) for x in params[0])
+            and all(isinstance(x, str) for x in params[1:]) and
+            (league or params[4] in RANKS)):
+        raise RuntimeError('Wrong event file name {}'.format(fname))
+
+    return params
+
+
+def parse_tournament(fname, registry):
+    tb_cols = []
+    vp_cols = []
+    nm_cols = []
+    fc_cols = []
+    tour_n = 0
+    players = []
+    tbs = []
+    vps = []
+    factions = registry.factions
+    with open(fname, 'r') as csvf:
+        rdr = csv.reader(csvf)
+        for i, l in enumerate(rdr):
+            if i == 0:
+                tb_cols = [
+                    i for i in range(len(l))
+                    if l[i] in ['t', 'T', 'TB', 'Tb', 'tb']
+                ]
+                vp_cols = [
+                    i for i in range(len(l))
+                    if l[i] in ['v', 'V', 'VP', 'Vp', 'vp']
+                ]
+                nm_cols = [
+                    i for i in range(len(l)) if l[i] in ['N', 'Name', 'Nick']
+                ]
+                fc_cols = [
+                    i for i in range(len(l)) if l[i] in ['F', 'Faction']
+                ]
+                tour_n = len(tb_cols)
+                if len(vp_cols) < tour_n or len(vp_cols) > (tour_n + 1):
+                    raise RuntimeError('Wrong tournament caption {}'.format(l))
+                continue
 
-        if not tourney_factions:
+            name = l[nm_cols[0] if nm_cols else 1].strip()
+            faction = None
+            if fc_cols:
+                fc_key = l[fc_cols[0]].strip().lower()
+                faction = factions[fc_key].name
+            tbs.extend(int(l[j]) for j in tb_cols)
+            vps.extend(int(l[k]) for k in vp_cols[:tour_n])
+            players.append((i, name, faction))
+
+    tourney_factions = {}
+    tourney_players = {}
+    missing_players = []
+    existing_players = registry.players
+    for i, name, faction in players:
+        if name != 'Proxy':
+            player = existing_players.resolve(name)
+            if player is None:
+                missing_players.append(name)
+            else:
+                name = player.name
+
+        tourney_players[i] = name
+        if faction is not None:
+            tourney_factions[i] = faction
+
+    if missing_players:
+        raise RuntimeError(existing_players.explain_missing(missing_players))
+
+    params = parse_metadata(fname)
+
+    if not tourney_factions:
+        raise RuntimeError(
+            'Tournament ({}) without specified factions'.format(params[1]))
+
+    matches = [[] for _ in range(tour_n)]
+    if players and tour_n:
+        # Seats of all tours as (tour, table) keys, sorted stably so the
+        # players of a table stay in file order.
+        ids = np.array([i for i, _, _ in players])
+        seated = np.array([name != 'Proxy' for _, name, _ in players])
+        tb = np.array(tbs, dtype=np.int64).reshape(-1, tour_n).T[:, seated]
+        vp = np.array(vps, dtype=np.int64).reshape(-1, tour_n).T[:, seated]
+        rows = np.broadcast_to(ids[seated], tb.shape)
+        tours = np.broadcast_to(np.arange(tour_n)[:, None], tb.shape)
+
+        first_tb = tb.min() if tb.size else 0
+        last_tb = tb.max() if tb.size else 0
+        keys = (tours * (last_tb - first_tb + 1) + tb - first_tb).ravel()
+        order = np.argsort(keys, kind='stable')
+        keys = keys[order]
+        _, starts, counts = np.unique(keys,
+                                      return_index=True,
+                                      return_counts=True)
+
+        crowded = np.flatnonzero(counts > 2)
+        if len(crowded):
+            seat = order[starts[crowded[0]]]
             raise RuntimeError(
-                'Tournament ({}) without specified factions'.format(name))
+                'Too many players on the same table (tour {}, table {})'.
+                format(tours.ravel()[seat], tb.ravel()[seat]))
+
+        # Tables with a single player are byes
+        starts = starts[counts == 2]
+        seat1 = order[starts]
+        seat2 = order[starts + 1]
+        vp = vp.ravel()
+        res = np.sign(vp[seat1] - vp[seat2])
+        for tour, i1, i2, r in zip(tours.ravel()[seat1].tolist(),
+                                   rows.ravel()[seat1].tolist(),
+                                   rows.ravel()[seat2].tolist(),
+                                   res.tolist()):
+            matches[tour].append((i1, i2, r))
+
+    return ('tournament', params, tourney_players,
+            tourney_factions, matches, cp.file_hash(fname))
+
+
+def parse_league(fname, registry):
+    params = None
+    tourney_players = {}
+    missing_players = []
+    matches = []
+    existing_players = registry.players
+    factions = registry.factions
+    with open(fname, 'r') as csvf:
+        rdr = csv.reader(csvf)
+        for i, l in enumerate(rdr):
+            if i == 0:
+                player_n = int(l[0])
+                continue
 
-        for tour in range(tour_n):
-            for t in sorted(tables):
-                table = []
-                for i, name, _, tours in players:
-                    if name != 'Proxy' and tours[tour][0] == t:
-                        table.append((i, tours[tour][1]))
+            if i <= player_n:
+                name = l[1].strip()
 
-                if len(table) < 2:
-                    continue
+                if name != 'Proxy':
+                    player = existing_players.resolve(name)
+                    if player is None:
+                        missing_players.append(name)
+                    else:
+                        name = player.name
 
-                if len(table) > 2:
-                    raise RuntimeError(
-                        'Too many players on the same table (tour {}, table {})'
-                        .format(tour, t))
+                tourney_players[l[0]] = name
+
+                if len(tourney_players) == player_n:
+                    if missing_players:
+                        raise RuntimeError(
+                            existing_players.explain_missing(missing_players))
 
-                i1 = table[0][0]
-                i2 = table[1][0]
-                res = 1 if table[0][1] > table[1][1] else (
-                    -1 if table[0][1] < table[1][1] else 0)
-                tourney.add_match(i1, i2, res)
+                    params = parse_metadata(fname, league=True)
+            else:
+                p1, p2, year, month, day, f1, f2 = l[:7]
 
-            tourney.end_current_tour()
+                if p1 == '' or p2 == '':
+                    continue
 
-    def load_league(self,
-                    fname,
-                    players_fname='players.csv',
-                    factions_fname='factions.csv'):
-        tourney = None
-        tourney_players = {}
-        missing_players = []
-        existing_players = Player.load_players(players_fname)
-        factions = Faction.load_factions(factions_fname)
-        with open(fname, 'r') as csvf:
-            rdr = csv.reader(csvf)
-            for i, l in enumerate(rdr):
-                if i == 0:
-                    player_n = int(l[0])
+                f1 = f1.strip().lower()
+                f1 = factions[f1].name if f1 in factions else None
+
+                f2 = f2.strip().lower()
+                f2 = factions[f2].name if f2 in factions else None
+
+                matches.append(
+                    (p1, p2, (int(year), int(month), int(day)), f1, f2))
+
+    return ('league', params, tourney_players, None, matches,
+            cp.file_hash(fname))
+
+
+class Calibration:
+    # Matches bucketed by the final rating difference of their players, with
+    # the actual and the expected score of the higher rated one.
+    def __init__(self, mu, rd_sq, p1, p2, drawn, system=elo, diff_step=1):
+        mu1, mu2 = mu[p1], mu[p2]
+        hi = mu1 >= mu2
+        diff = np.abs(mu1 - mu2)
+        buckets = (diff // diff_step).astype(int)
+        size = buckets.max() + 1 if len(buckets) else 0
+
+        actual = np.where(drawn, 0.5, np.where(hi, 1.0, 0.0))
+        expected = system.expected(np.where(hi, mu1, mu2),
+                                   np.where(hi, mu2, mu1), rd_sq[p1],
+                                   rd_sq[p2])
+
+        self.diff_step = diff_step
+        self.bounds = diff_step * np.arange(1, size + 1)
+        self.counts = np.bincount(buckets, minlength=size)
+        self.actual = np.bincount(buckets, actual, size)
+        self.expected = np.bincount(buckets, expected, size)
+
+    def rows(self):
+        for i in np.flatnonzero(self.counts):
+            n = self.counts[i]
+            yield (float(self.bounds[i] - self.diff_step),
+                   float(self.bounds[i]), int(n), float(self.actual[i] / n),
+                   float(self.expected[i] / n))
+
+
+class FactionMeta:
+    # Faction matchups (f1, f2, drawn) of the tournaments, without any player
+    # state. Pair matrices come from a single bincount, faction ratings
+    # are replayed only when asked for.
+    def __init__(self, tourneys, system=elo):
+        self.system = system
+        self.factions = []
+        ids = {}
+        dates = []
+        f1 = []
+        f2 = []
+        drawn = []
+        for date, _, tours in merge_events(tourneys):
+            for _, _, d, a, b in (m for tour in tours for m in tour):
+                if a is None or b is None or a == b:
                     continue
 
-                if i <= player_n:
-                    name = l[1].strip()
+                for f in (a, b):
+                    if f not in ids:
+                        ids[f] = len(self.factions)
+                        self.factions.append(f)
+
+                dates.append(date)
+                f1.append(ids[a])
+                f2.append(ids[b])
+                drawn.append(d)
+
+        n = len(self.factions)
+        self.dates = dates
+        self.f1 = np.array(f1, int)
+        self.f2 = np.array(f2, int)
+        self.drawn = np.array(drawn, bool)
+
+        # The first faction of a match is the winner unless it was drawn
+        pairs = self.f1 * n + self.f2
+        self.wins = np.bincount(pairs[~self.drawn],
+                                minlength=n * n).reshape(n, n)
+        draws = np.bincount(pairs[self.drawn], minlength=n * n).reshape(n, n)
+        self.draws = draws + draws.T
+        self.games = self.wins + self.wins.T + self.draws
+        self._ratings = None
+
+    def __len__(self):
+        return len(self.dates)
 
-                    if name not in existing_players and name != 'Proxy':
-                        missing_players.append(name)
+    @property
+    def ratings(self):
+        if self._ratings is None:
+            ratings = {f: self.system.Rating() for f in self.factions}
+            for date, a, b, d in zip(self.dates, self.f1.tolist(),
+                                     self.f2.tolist(), self.drawn.tolist()):
+                a, b = self.factions[a], self.factions[b]
+                ratings[a], ratings[b] = self.system.rate_1vs1(ratings[a],
+                                                               ratings[b],
+                                                               d,
+                                                               date=date)
+            self._ratings = ratings
+
+        return self._ratings
+
+    def score(self):
+        # Share of points (a draw is half a win) of a row faction against a
+        # column faction, NaN for pairs that never met
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return (self.wins + self.draws / 2) / self.games
+
+    def rows(self):
+        # (faction, rating, games, score) from the best rated faction down
+        games = self.games.sum(axis=1)
+        points = self.wins.sum(axis=1) + self.draws.sum(axis=1) / 2
+        ratings = self.ratings
+        for i in sorted(range(len(self.factions)),
+                        key=lambda i: -ratings[self.factions[i]].mu):
+            yield (self.factions[i], ratings[self.factions[i]].mu,
+                   int(games[i]), float(points[i] / games[i]))
+
+
+def count_matches(tourneys):
+    return sum(1 for t in tourneys for _ in t.iter_matches())
+
+
+def shift_months(date, months):
+    month = date.year * 12 + date.month - 1 + months
+    year, month = month // 12, month % 12 + 1
+    return datetime.date(year, month,
+                         min(date.day,
+                             calendar.monthrange(year, month)[1]))
+
+
+def schedule(start, end, months=3):
+    # As-of dates every given number of months from start up to end
+    dates = []
+    date = start
+    while date <= end:
+        dates.append(date)
+        date = shift_months(start, len(dates) * months)
+
+    return tuple(dates)
+
+
+def rate_events(ratings, system, events, faction_ratings=None, history=None):
+    for date, _, tours in events:
+        for tour in tours:
+            for p1, p2, drawn, f1, f2 in tour:
+                if p1 not in ratings:
+                    ratings[p1] = system.Rating()
 
-                    tourney_players[l[0]] = name
+                if p2 not in ratings:
+                    ratings[p2] = system.Rating()
 
-                    if len(tourney_players) == player_n:
-                        if missing_players:
-                            raise RuntimeError(
-                                'Missing players: {}'.format(missing_players))
+                if faction_ratings != None and f1 != None and f2 != None and f1 != f2:
+                    if f1 not in faction_ratings:
+                        faction_ratings[f1] = system.Rating()
 
-                        gl = {}
-                        exec(
-                            'params = ({})'.format(
-                                os.path.splitext(os.path.basename(fname))[0]),
-                            gl)
-                        date, name, org, city = gl['params']
+                    if f2 not in faction_ratings:
+                        faction_ratings[f2] = system.Rating()
 
-                        tourney = self.create_league(name, date, org, city,
-                                                     tourney_players)
+                    (ratings[p1], ratings[p2], faction_ratings[f1],
+                     faction_ratings[f2]) = system.rate_2vs2(
+                         ratings[p1],
+                         ratings[p2],
+                         faction_ratings[f1],
+                         faction_ratings[f2],
+                         drawn,
+                         date=date)
+
+                    if history is not None:
+                        history.record_faction(f1, faction_ratings[f1], date)
+                        history.record_faction(f2, faction_ratings[f2], date)
                 else:
-                    p1, p2, year, month, day, f1, f2 = l[:7]
-
-                    if p1 == '' or p2 == '':
-                        continue
+                    ratings[p1], ratings[p2] = system.rate_1vs1(
+                        ratings[p1], ratings[p2], drawn, date=date)
+
+                if history is not None:
+                    history.record(p1, ratings[p1], date)
+                    history.record(p2, ratings[p2], date)
+
+
+def rate_events_period(ratings,
+                       system,
+                       events,
+                       faction_ratings=None,
+                       history=None):
+    # Every event is a single rating period
+    if faction_ratings is not None:
+        raise ValueError('Rating periods do not rate factions')
+
+    for date, _, tours in events:
+        rt.rate_period(system, ratings, [m for tour in tours for m in tour],
+                       date, history)
+
+
+def _tag_events(tourney):
+    for date, tours in tourney.iter_events():
+        yield date, tourney, tours
+
+
+def merge_events(tourneys):
+    # Events of all tourneys as (date, tourney, tours) by real match date,
+    # so a league running for months is spread between the tournaments of
+    # those months. heapq.merge is stable: events of one date keep the
+    # order of tourneys.
+    return list(
+        heapq.merge(*(_tag_events(t) for t in tourneys), key=lambda e: e[0]))
+
+
+def system_files(system):
+    # Sources that decide the replayed ratings: a system module may only
+    # re-export the module that implements it (glicko_period), so that one
+    # is hashed as well, together with the batch tables.
+    return tuple(
+        dict.fromkeys((__file__, rt.__file__, system.__file__,
+                       sys.modules[system.Rating.__module__].__file__)))
+
+
+def replay(tourneys,
+           system=elo,
+           dates=(),
+           with_factions=False,
+           checkpoints=None,
+           batch=True,
+           history=None):
+    return replay_events(merge_events(tourneys), system, dates, with_factions,
+                         checkpoints, batch, history)
+
+
+def replay_events(events,
+                  system=elo,
+                  dates=(),
+                  with_factions=False,
+                  checkpoints=None,
+                  batch=True,
+                  history=None):
+    # Snapshot i is the state after the first points[i] events, the last
+    # one is the final state. A history has to see every rating change, so
+    # checkpoints are bypassed when one is recorded.
+    event_dates = [e[0] for e in events]
+    points = [bisect.bisect_left(event_dates, d)
+              for d in dates] + [len(events)]
+
+    # Factions take part in most matches, so their updates are sequential
+    # and only replays without them are batched.
+    periods = getattr(system, 'RATING_PERIODS', False)
+    batch = batch and hasattr(system, 'rate_batch') and not with_factions
+    if periods and with_factions:
+        raise ValueError('Rating periods do not rate factions')
+    if with_factions and not hasattr(system, 'rate_2vs2'):
+        raise ValueError('{} does not rate factions'.format(system.__name__))
+
+    keys = []
+    if checkpoints is not None and history is None:
+        keys = checkpoints.chain(events, system, with_factions, batch,
+                                 system_files(system))
+
+    states = {}
+    for p in points:
+        if p < len(keys) and p not in states:
+            state = checkpoints.load(keys[p])
+            if state is not None:
+                states[p] = state
+
+    missing = [p for p in points if p not in states]
+    if not missing:
+        return [states[p] for p in points]
+
+    # A kernel call costs about as much as a few scalar updates, so narrow
+    # waves (few players at a time) are rated match by match.
+    if batch and not periods:
+        schedule = rt.Schedule(events)
+        batch = schedule.width >= rt.MIN_WAVE
+
+    # Rating objects are never mutated by the rating systems, so shallow
+    # copies of the dictionaries are enough to freeze the state at a date.
+    # Batch and period replays keep the state in a rating table, which is
+    # frozen, ranked and saved as a copy of its arrays. A checkpoint may
+    # hold either form. Match by match replays (narrow waves, factions)
+    # stay on dictionaries: an update written to table rows costs as much
+    # as the Rating objects it saves.
+    def thaw(ratings):
+        tabular = isinstance(ratings, rt.RatingTable)
+        if periods or batch:
+            return (ratings.copy() if tabular else
+                    rt.RatingTable.from_ratings(system, ratings))
+
+        return ratings.to_ratings() if tabular else dict(ratings)
+
+    def update(lo, hi):
+        if periods:
+            rate_events_period(ratings, system, events[lo:hi],
+                               faction_ratings, history)
+        elif batch:
+            schedule.rate(system, ratings, lo, hi, history)
+        else:
+            rate_events(ratings, system, events[lo:hi], faction_ratings,
+                        history)
+
+    ratings = {}
+    faction_ratings = {} if with_factions else None
+    start = 0
+    for k in range(min(missing[0], len(keys) - 1), 0, -1):
+        state = states.get(k)
+        if state is None and keys[k] in checkpoints:
+            state = checkpoints.load(keys[k])
+
+        if state is not None:
+            ratings, faction_ratings = state
+            start = k
+            break
+
+    ratings = thaw(ratings)
+    faction_ratings = None if faction_ratings is None else thaw(
+        faction_ratings)
+
+    def current():
+        return (ratings.copy(),
+                None if faction_ratings is None else faction_ratings.copy())
+
+    # Events between two stops (snapshots and monthly checkpoints) are rated
+    # in one call, so batch waves may span many tournaments.
+    saves = set(i for i in range(start + 1, len(keys))
+                if i in missing or i == len(events)
+                or event_dates[i].month != event_dates[i - 1].month)
+    i = start
+    for stop in sorted(saves.union(missing)):
+        update(i, stop)
+        i = stop
+
+        if stop in missing:
+            states[stop] = current()
+
+        if stop in saves:
+            state = states.get(stop, (ratings, faction_ratings))
+            checkpoints.save(keys[stop], event_dates[stop - 1], *state)
+
+    return [states[p] for p in points]
+
+
+def replay_window(tourneys,
+                  system=elo,
+                  dates=(),
+                  window=12,
+                  with_factions=False,
+                  checkpoints=None,
+                  batch=True):
+    # Only events of the last window months before each date count, the
+    # final state covers the months up to the last event. Rating updates
+    # depend on the order of matches, so an old match can't be taken back
+    # out of a rating and a window is replayed from its first event. Windows
+    # that start at the same event share one replay with a snapshot at each
+    # end, and every replay keeps its own checkpoint chain: a window whose
+    # events haven't changed since the last run is loaded, not replayed.
+    events = merge_events(tourneys)
+    event_dates = [e[0] for e in events]
+    ends = list(dates)
+    ends.append(event_dates[-1] +
+                datetime.timedelta(1) if events else datetime.date.min)
+
+    starts = {}
+    for end in ends:
+        lo = 0
+        if end != datetime.date.min:
+            lo = bisect.bisect_left(event_dates, shift_months(end, -window))
+        starts.setdefault(lo, []).append(end)
+
+    states = {}
+    for lo, group in starts.items():
+        hi = bisect.bisect_left(event_dates, max(group))
+        snapshots = replay_events(events[lo:hi], system, group, with_factions,
+                                  checkpoints, batch)
+        states.update(zip(group, snapshots))
+
+    return [states[end] for end in ends]
+
+
+class Standings:
+    def __init__(self,
+                 players,
+                 player_check=None,
+                 system=elo,
+                 min_n=5,
+                 filter_date=None,
+                 max_rd_ratio=0.9):
+        try:
+            r = system.Rating()
+            _ = r.rdSq
+            self.with_rd = True
+        except AttributeError:
+            self.with_rd = False
+
+        self.players = players
+        self.player_check = player_check
+        self.system = system
+        self.min_n = min_n
+        self.filter_date = filter_date
+        self.max_rd_ratio = max_rd_ratio
+        self.result = []
+        self.prev_ids = {}
+        self.prev_faction_ids = {}
+        self._included = {}
+
+        # Boards persist between separations, only names whose sort key
+        # changed since the previous one are moved.
+        self.board = lb.Leaderboard()
+        self.faction_board = lb.Leaderboard()
+        self._rows = {}
+        self._faction_rows = {}
+
+    def check_rating(self, r, date):
+        if self.with_rd:
+            return r.getRdSq(date) < (self.system.MAX_RD_SQ *
+                                      self.max_rd_ratio * self.max_rd_ratio)
+
+        return (r.n >= self.min_n or self.filter_date is None
+                or date <= self.filter_date)
+
+    def include(self, p):
+        if p not in self._included:
+            player = self.players[p]
+            self._included[p] = not player.hidden and (
+                self.player_check is None or self.player_check(player))
+
+        return self._included[p]
+
+    def _columns(self, ratings, names, date):
+        # (name, rating, check_rating, StD) of the given names. A rating
+        # table is checked a column at a time.
+        if not isinstance(ratings, rt.RatingTable):
+            if not self.with_rd:
+                for name in names:
+                    r = ratings[name]
+                    yield name, r.mu, self.check_rating(r, date), 0
+                return
+
+            limit = (self.system.MAX_RD_SQ * self.max_rd_ratio *
+                     self.max_rd_ratio)
+            for name in names:
+                r = ratings[name]
+                rd_sq = r.getRdSq(date)
+                yield name, r.mu, rd_sq < limit, rd_sq**0.5
+            return
+
+        idx = np.fromiter(map(ratings.ids.__getitem__, names), np.int64,
+                          len(names))
+        if self.with_rd:
+            rd_sq = self.system.get_rd_sq(ratings, idx, date.toordinal())
+            ok = rd_sq < (self.system.MAX_RD_SQ * self.max_rd_ratio *
+                          self.max_rd_ratio)
+            rd = np.sqrt(rd_sq)
+        else:
+            ok = ratings.n[idx] >= self.min_n
+            ok |= self.filter_date is None or date <= self.filter_date
+            rd = np.zeros(len(idx), dtype=int)
+
+        yield from zip(names, ratings.mu[idx].tolist(), ok.tolist(),
+                       rd.tolist())
+
+    def _update_board(self, board, rows, ratings, names, date, display):
+        # Windowed ratings lose everyone without matches in the window
+        for name in [name for name in rows if name not in ratings]:
+            board.remove(name)
+            del rows[name]
+
+        changed = []
+        for name, mu, ok, rd in self._columns(ratings, names, date):
+            prev = rows.get(name)
+            if prev is None or prev[:2] != (mu, ok):
+                changed.append(name)
+            rows[name] = (mu, ok, rd)
+
+        for name in changed:
+            mu, ok, _ = rows[name]
+            board.update(name, (-mu if ok else 0, display(name)))
+
+    def _table(self, board, rows, prev_table, prev_ids, item):
+        table = []
+        ids = {}
+        for name in board:
+            mu, ok, rd = rows[name]
+            rating = mu if ok else None
+
+            if table:
+                new = rating != table[-1][2]
+                position = len(table) + 1 if new else table[-1][0]
+            else:
+                new = True
+                position = 1
+
+            diff_p = None
+            diff_r = None
+            if name in prev_ids:
+                prev = prev_table[prev_ids[name]]
+                diff_p = prev[0] - position
+                if rating != None and prev[2] != None:
+                    diff_r = rating - prev[2]
+
+            ids[name] = len(table)
+            table.append((position, item(name), rating, rd, diff_p, diff_r))
+
+        return table, ids
+
+    def separate(self, date, ratings, faction_ratings=None):
+        prev_players, prev_factions = self.result[-1] if self.result else ([],
+                                                                           [])
+
+        factions = []
+        ids = {}
+        if faction_ratings:
+            self._update_board(self.faction_board, self._faction_rows,
+                               faction_ratings, list(faction_ratings), date,
+                               lambda f: f)
+            factions, ids = self._table(self.faction_board,
+                                        self._faction_rows, prev_factions,
+                                        self.prev_faction_ids, lambda f: f)
+
+        self.prev_faction_ids = ids
+
+        self._update_board(self.board, self._rows, ratings,
+                           [p for p in ratings if self.include(p)], date,
+                           lambda p: self.players[p].display)
+        players, self.prev_ids = self._table(self.board, self._rows,
+                                             prev_players, self.prev_ids,
+                                             lambda p: self.players[p])
+
+        self.result.append((players, factions))
+
+
+def rank_players(snapshots,
+                 sep,
+                 tourneys,
+                 cur_date,
+                 players,
+                 player_check=None,
+                 system=elo,
+                 min_n=5,
+                 filter_date=None,
+                 max_rd_ratio=0.9):
+    # The latest date is the last milestone or the last tournament with
+    # at least one player passing player_check, whichever comes later.
+    latest_date = sep[-1] if sep else None
+    for tourney in tourneys:
+        if latest_date is not None and tourney.date <= latest_date:
+            continue
+
+        if player_check is None or tourney.check_players(players, player_check):
+            latest_date = tourney.date
+
+    latest_date = cur_date if latest_date is None else latest_date
+
+    standings = Standings(players, player_check, system, min_n, filter_date,
+                          max_rd_ratio)
+    for date, (ratings, faction_ratings) in zip(sep, snapshots):
+        standings.separate(date, ratings, faction_ratings)
+
+    standings.separate(latest_date, *snapshots[-1])
+
+    return standings.result, latest_date
+
+
+class RatingEngine:
+    def __init__(self, tournaments, dates=(), checkpoints=None, batch=True):
+        self._tournaments = tournaments
+        self._dates = tuple(sorted(dates))
+        self._checkpoints = checkpoints
+        self._batch = batch
+        self._replays = {}
+        self._histories = {}
+        self._metas = {}
 
-                    f1 = f1.strip().lower()
-                    f1 = factions[f1].name if f1 in factions else None
+    @property
+    def dates(self):
+        return self._dates
 
-                    f2 = f2.strip().lower()
-                    f2 = factions[f2].name if f2 in factions else None
+    @property
+    def replay_count(self):
+        return len(self._replays)
+
+    def prepare(self,
+                system=elo,
+                tourney_check=None,
+                with_factions=False,
+                window=None):
+        # Views share a replay unless tourney_check really changes the set
+        # of counted tournaments.
+        tourneys = self._tournaments.chronological(tourney_check)
+        key = (system, tuple(id(t) for t in tourneys), with_factions, window)
+        if key not in self._replays:
+            with pf.stage('replay', lambda: count_matches(tourneys),
+                          hot=True):
+                if window is None:
+                    self._replays[key] = replay(tourneys, system,
+                                                self._dates, with_factions,
+                                                self._checkpoints,
+                                                self._batch)
+                else:
+                    self._replays[key] = replay_window(
+                        tourneys, system, self._dates, window, with_factions,
+                        self._checkpoints, self._batch)
+
+        return tourneys, self._replays[key]
+
+    def faction_meta(self, system=elo, tourney_check=None):
+        tourneys = self._tournaments.chronological(tourney_check)
+        key = (system, tuple(id(t) for t in tourneys))
+        if key not in self._metas:
+            self._metas[key] = FactionMeta(tourneys, system)
+
+        return self._metas[key]
+
+    def history(self, system=elo, tourney_check=None, with_factions=False):
+        # Full rating timelines, recorded once per set of counted tournaments
+        tourneys = self._tournaments.chronological(tourney_check)
+        key = (system, tuple(id(t) for t in tourneys), with_factions)
+        if key not in self._histories:
+            history = hs.History()
+            replay(tourneys,
+                   system,
+                   with_factions=with_factions,
+                   batch=self._batch,
+                   history=history)
+            self._histories[key] = history
+
+        return self._histories[key]
 
-                    tourney.add_match(
-                        p1, p2, 1,
-                        datetime.date(int(year), int(month), int(day)), f1, f2)
+    def rate_players(self,
+                     cur_date,
+                     players,
+                     player_check=None,
+                     tourney_check=None,
+                     system=elo,
+                     sep=(),
+                     min_n=5,
+                     filter_date=None,
+                     max_rd_ratio=0.9,
+                     with_factions=False,
+                     window=None):
+        if not set(sep) <= set(self._dates):
+            return self._tournaments.rate_players(
+                cur_date, players, player_check, tourney_check, system, sep,
+                min_n, filter_date, max_rd_ratio, with_factions,
+                self._checkpoints, self._batch, window=window)
+
+        tourneys, snapshots = self.prepare(system, tourney_check,
+                                           with_factions, window)
+        snapshots = [snapshots[self._dates.index(d)]
+                     for d in sep] + [snapshots[-1]]
+
+        with pf.stage('rank'):
+            return rank_players(snapshots, sep, tourneys, cur_date, players,
+                                player_check, system, min_n, filter_date,
+                                max_rd_ratio)
@@ -0,0 +1,232 @@
+import statistics
+import numpy as np
+import math
+
+# TrueSkill-like model on the Glicko scale: a team is a player together
+# with the faction played, its performance is the sum of the members'
+# Gaussian skills plus BETA noise per member.
+MAX_RD = 350.0
+MAX_RD_SQ = MAX_RD * MAX_RD
+BETA = MAX_RD / 2
+C_SQUARE = MAX_RD_SQ * 0.9 / (365 * 1.5)
+DRAW_PROBABILITY = 0.05
+DRAW_Z = statistics.NormalDist().inv_cdf((DRAW_PROBABILITY + 1) / 2)
+TINY = 2.222758749e-162
+
+
+class Rating:
+    __slots__ = ('mu', 'n', 'rdSq', 'last_active')
+
+    def __init__(self, mu=1500.0, n=0, rdSq=MAX_RD_SQ, date=None):
+        self.mu = mu
+        self.n = n
+        self.rdSq = rdSq
+        self.last_active = date
+
+    def getRdSq(self, date=None):
+        if date is None:
+            return self.rdSq
+
+        if self.last_active is None:
+            return MAX_RD_SQ
+
+        dt = (date - self.last_active).days
+        if dt < 0:
+            return self.rdSq
+        return min(self.rdSq + dt * C_SQUARE, MAX_RD_SQ)
+
+
+def v_w(t, eps, drawn):
+    # Mean and variance corrections of the truncated Gaussian, t is the
+    # performance difference in favour of the first team.
+    if not drawn:
+        x = t - eps
+        denom = math.erfc(-x / math.sqrt(2)) / 2
+        if denom < TINY:
+            return -x, 1.0 if x < 0 else 0.0
+
+        v = math.exp(-x * x / 2) / math.sqrt(2 * math.pi) / denom
+        return v, v * (v + x)
+
+    a = eps - abs(t)
+    b = -eps - abs(t)
+    denom = (math.erfc(-a / math.sqrt(2)) - math.erfc(-b / math.sqrt(2))) / 2
+    if denom < TINY:
+        return (-t - eps if t < 0 else -t + eps), 1.0
+
+    pdf_a = math.exp(-a * a / 2) / math.sqrt(2 * math.pi)
+    pdf_b = math.exp(-b * b / 2) / math.sqrt(2 * math.pi)
+    v = (pdf_b - pdf_a) / denom
+    return (-v if t < 0 else v), v * v + (a * pdf_a - b * pdf_b) / denom
+
+
+def update(mu1, rd1Sq, mu2, rd2Sq, fmu1, frd1Sq, fmu2, frd2Sq, size, drawn):
+    # One match of two teams of size / 2 members, the first team won unless
+    # drawn. Faction arguments are zero for matches without factions.
+    cSq = size * BETA * BETA + rd1Sq + rd2Sq + frd1Sq + frd2Sq
+    c = math.sqrt(cSq)
+    v, w = v_w((mu1 + fmu1 - mu2 - fmu2) / c,
+               DRAW_Z * math.sqrt(size) * BETA / c, drawn)
+
+    def member(mu, rdSq, sign):
+        return (mu + sign * rdSq / c * v,
+                rdSq * max(1 - rdSq / cSq * w, 0.0001))
+
+    return (member(mu1, rd1Sq, 1), member(mu2, rd2Sq, -1),
+            member(fmu1, frd1Sq, 1), member(fmu2, frd2Sq, -1))
+
+
+def rate_1vs1(r1, r2, drawn=False, date=None):
+    (mu1, rd1Sq), (mu2, rd2Sq), _, _ = update(r1.mu, r1.getRdSq(date), r2.mu,
+                                              r2.getRdSq(date), 0.0, 0.0, 0.0,
+                                              0.0, 2, drawn)
+
+    new_r1 = Rating(mu1, r1.n + 1, rd1Sq, date)
+    new_r2 = Rating(mu2, r2.n + 1, rd2Sq, date)
+    return (new_r1, new_r2)
+
+
+def rate_2vs2(r1, r2, p1, p2, drawn=False, date=None):
+    res = update(r1.mu, r1.getRdSq(date), r2.mu, r2.getRdSq(date), p1.mu,
+                 p1.getRdSq(date), p2.mu, p2.getRdSq(date), 4, drawn)
+
+    return tuple(
+        Rating(mu, r.n + 1, rdSq, date)
+        for r, (mu, rdSq) in zip((r1, r2, p1, p2), res))
+
+
+# Rational Chebyshev approximations of W. J. Cody (Math. Comp. 23, 1969),
+# as in his CALERF: erf on |x| <= 0.46875, erfc / exp(-x^2) up to 4 and an
+# asymptotic series in 1 / x^2 beyond. Relative error stays around 1e-16,
+# so arrays are rated as math.erfc would rate each element. Rows are the
+# (numerator, denominator) coefficients by increasing power.
+ERF_SMALL = np.array(((3.20937758913846947e03, 2.84423683343917062e03),
+                      (3.77485237685302021e02, 1.28261652607737228e03),
+                      (1.13864154151050156e02, 2.44024637934444173e02),
+                      (3.16112374387056560e00, 2.36012909523441209e01),
+                      (1.85777706184603153e-1, 1.0)))
+ERFC_MID = np.array(((1.23033935479799725e03, 1.23033935480374942e03),
+                     (2.05107837782607147e03, 3.43936767414372164e03),
+                     (1.71204761263407058e03, 4.36261909014324716e03),
+                     (8.81952221241769090e02, 3.29079923573345963e03),
+                     (2.98635138197400131e02, 1.62138957456669019e03),
+                     (6.61191906371416295e01, 5.37181101862009858e02),
+                     (8.88314979438837594e00, 1.17693950891312499e02),
+                     (5.64188496988670089e-1, 1.57449261107098347e01),
+                     (2.15311535474403846e-8, 1.0)))
+ERFC_BIG = np.array(((6.58749161529837803e-4, 2.33520497626869185e-3),
+                     (1.60837851487422766e-2, 6.05183413124413191e-2),
+                     (1.25781726111229246e-1, 5.27905102951428412e-1),
+                     (3.60344899949804439e-1, 1.87295284992346725e00),
+                     (3.05326634961232344e-1, 2.56852019228982242e00),
+                     (1.63153871373020978e-2, 1.0)))
+# erfc underflows to zero beyond
+ERFC_MAX = 26.543
+
+
+def _rational(z, coeffs):
+    # All coefficients are positive, so plain sums of the powers are as
+    # accurate as Horner's rule and take a single matrix product
+    num, den = (np.vander(z, len(coeffs), increasing=True) @ coeffs).T
+    return num / den
+
+
+def _exp_sq(y):
+    # exp(-y^2) as exp(-ysq^2) * exp(-del) to keep its precision
+    ysq = np.trunc(y * 16) / 16
+    return np.exp(-ysq * ysq) * np.exp(-(y - ysq) * (y + ysq))
+
+
+def erfc(x):
+    # Elements are split between the three ranges, a range without any
+    # costs nothing
+    x = np.asarray(x, dtype=float)
+    y = np.abs(x).ravel()
+    res = np.where(y >= ERFC_MAX, 0.0, np.nan)
+
+    idx = np.flatnonzero(y <= 0.46875)
+    if len(idx):
+        z = y[idx]
+        res[idx] = 1 - x.ravel()[idx] * _rational(z * z, ERF_SMALL)
+
+    idx = np.flatnonzero((y > 0.46875) & (y <= 4))
+    if len(idx):
+        z = y[idx]
+        res[idx] = _exp_sq(z) * _rational(z, ERFC_MID)
+
+    idx = np.flatnonzero((y > 4) & (y < ERFC_MAX))
+    if len(idx):
+        z = y[idx]
+        zsq = 1 / (z * z)
+        res[idx] = _exp_sq(z) * (1 / math.sqrt(math.pi) -
+                                 zsq * _rational(zsq, ERFC_BIG)) / z
+
+    res = res.reshape(x.shape)
+    return np.where(x < -0.46875, 2 - res, res)
+
+
+def cdf(x):
+    return erfc(-x / math.sqrt(2)) / 2
+
+
+def pdf(x):
+    return np.exp(-x * x / 2) / math.sqrt(2 * math.pi)
+
+
+def v_w_batch(t, eps, drawn):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x = t - eps
+        a = eps - np.abs(t)
+        b = -eps - np.abs(t)
+        # The three arguments go through cdf and pdf in one call each
+        xab = np.concatenate((x, a, b))
+        cdf_x, cdf_a, cdf_b = np.split(cdf(xab), 3)
+        pdf_x, pdf_a, pdf_b = np.split(pdf(xab), 3)
+
+        v_win = np.where(cdf_x > TINY, pdf_x / cdf_x, -x)
+        w_win = np.where(cdf_x > TINY, v_win * (v_win + x),
+                         np.where(x < 0, 1.0, 0.0))
+
+        denom = cdf_a - cdf_b
+        ok = denom > TINY
+        v_draw = np.where(ok, (pdf_b - pdf_a) / denom,
+                          np.where(t < 0, -t - eps, -t + eps))
+        w_draw = np.where(ok, v_draw * v_draw +
+                          (a * pdf_a - b * pdf_b) / denom, 1.0)
+        v_draw = np.where(ok & (t < 0), -v_draw, v_draw)
+
+    return np.where(drawn, v_draw, v_win), np.where(drawn, w_draw, w_win)
+
+
+def get_rd_sq(ratings, idx, date):
+    rdSq = ratings.rdSq[idx]
+    last_active = ratings.last_active[idx]
+    dt = date - last_active
+    res = np.minimum(rdSq + dt * C_SQUARE, MAX_RD_SQ)
+    res = np.where(dt < 0, rdSq, res)
+    return np.where(last_active == 0, MAX_RD_SQ, res)
+
+
+def rate_batch(ratings, p1, p2, drawn, date):
+    # rate_1vs1 over rows of a rating table, no row may appear twice in one
+    # call. date holds the ordinal of every match.
+    mu1 = ratings.mu[p1]
+    mu2 = ratings.mu[p2]
+    rd1Sq = get_rd_sq(ratings, p1, date)
+    rd2Sq = get_rd_sq(ratings, p2, date)
+    cSq = 2 * BETA * BETA + rd1Sq + rd2Sq
+    c = np.sqrt(cSq)
+    v, w = v_w_batch((mu1 - mu2) / c, DRAW_Z * math.sqrt(2) * BETA / c, drawn)
+
+    ratings.mu[p1] = mu1 + rd1Sq / c * v
+    ratings.mu[p2] = mu2 - rd2Sq / c * v
+    ratings.rdSq[p1] = rd1Sq * np.maximum(1 - rd1Sq / cSq * w, 0.0001)
+    ratings.rdSq[p2] = rd2Sq * np.maximum(1 - rd2Sq / cSq * w, 0.0001)
+    ratings.n[p1] += 1
+    ratings.n[p2] += 1
+    ratings.last_active[p1] = date
+    ratings.last_active[p2] = date
+
+
+def expected(mu1, mu2, rd1Sq, rd2Sq):
+    return cdf((mu1 - mu2) / np.sqrt(2 * BETA * BETA + rd1Sq + rd2Sq))
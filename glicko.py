@@ -1,3 +1,4 @@
+import numpy as np
 import math
 
 MAX_RD = 350.0
@@ -7,6 +8,8 @@ Q = math.log(10) / 400
 
 
 class Rating:
+    __slots__ = ('mu', 'n', 'rdSq', 'last_active')
+
     def __init__(self, mu=1500.0, n=0, rdSq=MAX_RD_SQ, date=None):
         self.mu = mu
         self.n = n
@@ -45,3 +48,75 @@ def rate_1vs1(r1, r2, drawn=False, k=32, date=None):
     new_r2 = Rating(r2.mu + Q * grd2_1 * (1 - s - e2_1) *
                     new_rd2Sq, r2.n + 1, new_rd2Sq, date)
     return (new_r1, new_r2)
+
+
+def get_rd_sq(ratings, idx, date):
+    rdSq = ratings.rdSq[idx]
+    last_active = ratings.last_active[idx]
+    dt = date - last_active
+    res = np.minimum(rdSq + dt * C_SQUARE, MAX_RD_SQ)
+    res = np.where(dt < 0, rdSq, res)
+    return np.where(last_active == 0, MAX_RD_SQ, res)
+
+
+def rate_batch(ratings, p1, p2, drawn, date):
+    # rate_1vs1 over rows of a rating table, no row may appear twice in one
+    # call. date holds the ordinal of every match.
+    s = np.where(drawn, 0.5, 1.0)
+    mu1 = ratings.mu[p1]
+    mu2 = ratings.mu[p2]
+    rd1Sq = get_rd_sq(ratings, p1, date)
+    rd2Sq = get_rd_sq(ratings, p2, date)
+    grd1_2 = 1.0 / np.sqrt(1 + 3 * Q * Q * rd2Sq / (math.pi * math.pi))
+    grd2_1 = 1.0 / np.sqrt(1 + 3 * Q * Q * rd1Sq / (math.pi * math.pi))
+    e1_2 = 1.0 / (1.0 + 10.0 ** (grd1_2 * (mu2 - mu1) / 400.0))
+    e2_1 = 1.0 / (1.0 + 10.0 ** (grd2_1 * (mu1 - mu2) / 400.0))
+    d1Sq = 1.0 / (Q * Q * grd1_2 * grd1_2 * e1_2 * (1 - e1_2))
+    d2Sq = 1.0 / (Q * Q * grd2_1 * grd2_1 * e2_1 * (1 - e2_1))
+
+    new_rd1Sq = 1.0 / (1.0 / rd1Sq + 1.0 / d1Sq)
+    new_rd2Sq = 1.0 / (1.0 / rd2Sq + 1.0 / d2Sq)
+    ratings.mu[p1] = mu1 + Q * grd1_2 * (s - e1_2) * new_rd1Sq
+    ratings.mu[p2] = mu2 + Q * grd2_1 * (1 - s - e2_1) * new_rd2Sq
+    ratings.rdSq[p1] = new_rd1Sq
+    ratings.rdSq[p2] = new_rd2Sq
+    ratings.n[p1] += 1
+    ratings.n[p2] += 1
+    ratings.last_active[p1] = date
+    ratings.last_active[p2] = date
+
+
+def expected(mu1, mu2, rd1Sq, rd2Sq):
+    g = 1.0 / np.sqrt(1 + 3 * Q * Q * (rd1Sq + rd2Sq) / (math.pi * math.pi))
+    return 1.0 / (1.0 + 10.0**(g * (mu2 - mu1) / 400.0))
+
+
+def rate_period(ratings, p1, p2, drawn, date=0):
+    # One Glicko rating period over rows of a rating table: rows may repeat,
+    # every participant gets a single update from the d^2 and g*(s - E) sums
+    # of all its games, computed against the pre-period ratings.
+    size = len(ratings)
+    idx = np.unique(np.concatenate((p1, p2)))
+    rdSq = np.empty(size)
+    rdSq[idx] = get_rd_sq(ratings, idx, date)
+
+    s = np.where(drawn, 0.5, 1.0)
+    mu1 = ratings.mu[p1]
+    mu2 = ratings.mu[p2]
+    grd1_2 = 1.0 / np.sqrt(1 + 3 * Q * Q * rdSq[p2] / (math.pi * math.pi))
+    grd2_1 = 1.0 / np.sqrt(1 + 3 * Q * Q * rdSq[p1] / (math.pi * math.pi))
+    e1_2 = 1.0 / (1.0 + 10.0 ** (grd1_2 * (mu2 - mu1) / 400.0))
+    e2_1 = 1.0 / (1.0 + 10.0 ** (grd2_1 * (mu1 - mu2) / 400.0))
+
+    dInv = (np.bincount(p1, Q * Q * grd1_2 * grd1_2 * e1_2 * (1 - e1_2), size)
+            + np.bincount(p2, Q * Q * grd2_1 * grd2_1 * e2_1 * (1 - e2_1),
+                          size))
+    delta = (np.bincount(p1, grd1_2 * (s - e1_2), size) +
+             np.bincount(p2, grd2_1 * (1 - s - e2_1), size))
+    games = np.bincount(p1, minlength=size) + np.bincount(p2, minlength=size)
+
+    new_rdSq = 1.0 / (1.0 / rdSq[idx] + dInv[idx])
+    ratings.mu[idx] += Q * delta[idx] * new_rdSq
+    ratings.rdSq[idx] = new_rdSq
+    ratings.n[idx] += games[idx]
+    ratings.last_active[idx] = date
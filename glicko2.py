@@ -0,0 +1,178 @@
+import numpy as np
+import math
+from glicko import expected
+
+MAX_RD = 350.0
+MAX_RD_SQ = MAX_RD * MAX_RD
+SCALE = 400 / math.log(10)
+SIGMA = 0.06
+TAU = 0.5
+EPS = 0.000001
+# Deviations grow by one period's volatility every PERIOD_DAYS of inactivity
+PERIOD_DAYS = 30
+
+
+class Rating:
+    __slots__ = ('mu', 'n', 'rdSq', 'sigma', 'last_active')
+
+    def __init__(self, mu=1500.0, n=0, rdSq=MAX_RD_SQ, sigma=SIGMA, date=None):
+        self.mu = mu
+        self.n = n
+        self.rdSq = rdSq
+        self.sigma = sigma
+        self.last_active = date
+
+    def getRdSq(self, date=None):
+        if date is None:
+            return self.rdSq
+
+        if self.last_active is None:
+            return MAX_RD_SQ
+
+        dt = (date - self.last_active).days
+        if dt < 0:
+            return self.rdSq
+        return min(self.rdSq + dt / PERIOD_DAYS * self.sigma * self.sigma *
+                   SCALE * SCALE, MAX_RD_SQ)
+
+
+def volatility(delta, phiSq, v, sigma):
+    # Step 5 of Glickman's Glicko-2 description (Illinois algorithm)
+    a = math.log(sigma * sigma)
+
+    def f(x):
+        ex = math.exp(x)
+        return (ex * (delta * delta - phiSq - v - ex) /
+                (2 * (phiSq + v + ex)**2) - (x - a) / (TAU * TAU))
+
+    A = a
+    if delta * delta > phiSq + v:
+        B = math.log(delta * delta - phiSq - v)
+    else:
+        B = a - TAU
+        while f(B) < 0:
+            B -= TAU
+
+    fA = f(A)
+    fB = f(B)
+    while abs(B - A) > EPS:
+        C = A + (A - B) * fA / (fB - fA)
+        fC = f(C)
+        if fC * fB <= 0:
+            A, fA = B, fB
+        else:
+            fA /= 2
+        B, fB = C, fC
+
+    return math.exp(A / 2)
+
+
+def _rate(r, rdSq, o_mu, o_rdSq, s, date=None):
+    # One game of r against an opponent rated o_mu, o_rdSq as a Glicko-2
+    # rating period of its own
+    m = (r.mu - 1500.0) / SCALE
+    phiSq = rdSq / (SCALE * SCALE)
+    g = 1.0 / math.sqrt(1 + 3 * o_rdSq / (SCALE * SCALE * math.pi * math.pi))
+    e = 1.0 / (1.0 + math.exp(-g * (m - (o_mu - 1500.0) / SCALE)))
+    v = 1.0 / (g * g * e * (1 - e))
+
+    sigma = volatility(v * g * (s - e), phiSq, v, r.sigma)
+    phiSq = 1.0 / (1.0 / (phiSq + sigma * sigma) + 1.0 / v)
+    return Rating(1500.0 + SCALE * (m + phiSq * g * (s - e)), r.n + 1,
+                  min(phiSq * SCALE * SCALE, MAX_RD_SQ), sigma, date)
+
+
+def rate_1vs1(r1, r2, drawn=False, date=None):
+    s = 0.5 if drawn else 1.0
+    rd1Sq = r1.getRdSq(date)
+    rd2Sq = r2.getRdSq(date)
+    return (_rate(r1, rd1Sq, r2.mu, rd2Sq, s, date),
+            _rate(r2, rd2Sq, r1.mu, rd1Sq, 1 - s, date))
+
+
+def rate_2vs2(r1, r2, p1, p2, drawn=False, date=None):
+    # Player r1 with faction p1 against r2 with p2. A team plays with the
+    # sum of its ratings and variances, so every member faces the other
+    # team less its own partner: an opponent of mu o1 + o2 - partner and
+    # the variance of the other three.
+    s = 0.5 if drawn else 1.0
+    rd1Sq, rd2Sq, pd1Sq, pd2Sq = (r.getRdSq(date) for r in (r1, r2, p1, p2))
+    return (_rate(r1, rd1Sq, r2.mu + p2.mu - p1.mu, rd2Sq + pd2Sq + pd1Sq, s,
+                  date),
+            _rate(r2, rd2Sq, r1.mu + p1.mu - p2.mu, rd1Sq + pd1Sq + pd2Sq,
+                  1 - s, date),
+            _rate(p1, pd1Sq, r2.mu + p2.mu - r1.mu, rd2Sq + pd2Sq + rd1Sq, s,
+                  date),
+            _rate(p2, pd2Sq, r1.mu + p1.mu - r2.mu, rd1Sq + pd1Sq + rd2Sq,
+                  1 - s, date))
+
+
+def get_rd_sq(ratings, idx, date):
+    rdSq = ratings.rdSq[idx]
+    sigma = ratings.sigma[idx]
+    last_active = ratings.last_active[idx]
+    dt = date - last_active
+    res = np.minimum(
+        rdSq + dt / PERIOD_DAYS * sigma * sigma * SCALE * SCALE, MAX_RD_SQ)
+    res = np.where(dt < 0, rdSq, res)
+    return np.where(last_active == 0, MAX_RD_SQ, res)
+
+
+def volatility_batch(delta, phiSq, v, sigma):
+    # volatility for all rows at once, iterated until every row converged
+    a = np.log(sigma * sigma)
+
+    def f(x):
+        ex = np.exp(x)
+        return (ex * (delta * delta - phiSq - v - ex) /
+                (2 * (phiSq + v + ex)**2) - (x - a) / (TAU * TAU))
+
+    big = delta * delta > phiSq + v
+    A = a
+    B = np.where(big, np.log(np.where(big, delta * delta - phiSq - v, 1.0)),
+                 a - TAU)
+    low = ~big & (f(B) < 0)
+    while low.any():
+        B = np.where(low, B - TAU, B)
+        low &= f(B) < 0
+
+    fA = f(A)
+    fB = f(B)
+    todo = np.abs(B - A) > EPS
+    with np.errstate(divide='ignore', invalid='ignore'):
+        while todo.any():
+            C = A + (A - B) * fA / (fB - fA)
+            fC = f(C)
+            swap = fC * fB <= 0
+            A = np.where(todo & swap, B, A)
+            fA = np.where(todo, np.where(swap, fB, fA / 2), fA)
+            B = np.where(todo, C, B)
+            fB = np.where(todo, fC, fB)
+            todo &= np.abs(B - A) > EPS
+
+    return np.exp(A / 2)
+
+
+def rate_batch(ratings, p1, p2, drawn, date):
+    # rate_1vs1 over rows of a rating table, no row may appear twice in one
+    # call. date holds the ordinal of every match.
+    s = np.where(drawn, 0.5, 1.0)
+    s = np.concatenate((s, 1 - s))
+    rows = np.concatenate((p1, p2))
+    date = np.concatenate((date, date))
+    rdSq = get_rd_sq(ratings, rows, date)
+    o_rdSq = np.concatenate((rdSq[len(p1):], rdSq[:len(p1)]))
+    m = (ratings.mu[rows] - 1500.0) / SCALE
+    o_m = (ratings.mu[np.concatenate((p2, p1))] - 1500.0) / SCALE
+    phiSq = rdSq / (SCALE * SCALE)
+    g = 1.0 / np.sqrt(1 + 3 * o_rdSq / (SCALE * SCALE * math.pi * math.pi))
+    e = 1.0 / (1.0 + np.exp(-g * (m - o_m)))
+    v = 1.0 / (g * g * e * (1 - e))
+
+    sigma = volatility_batch(v * g * (s - e), phiSq, v, ratings.sigma[rows])
+    phiSq = 1.0 / (1.0 / (phiSq + sigma * sigma) + 1.0 / v)
+    ratings.mu[rows] = 1500.0 + SCALE * (m + phiSq * g * (s - e))
+    ratings.rdSq[rows] = np.minimum(phiSq * SCALE * SCALE, MAX_RD_SQ)
+    ratings.sigma[rows] = sigma
+    ratings.n[rows] += 1
+    ratings.last_active[rows] = date
@@ -0,0 +1,6 @@
+# Glicko with rating periods: a tournament, or a single match date of a
+# league, is one period and every player is updated once per period.
+from glicko import (MAX_RD, MAX_RD_SQ, C_SQUARE, Q, Rating, rate_1vs1,
+                    get_rd_sq, rate_batch, rate_period, expected)
+
+RATING_PERIODS = True
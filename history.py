@@ -0,0 +1,95 @@
+import datetime
+import bisect
+import array
+
+BLOCK = 32
+
+
+class Timeline:
+    # Append-only series of (date, mu, rdSq). Dates are stored as day deltas
+    # to the previous entry, with an absolute anchor at the start of every
+    # BLOCK entries, so a lookup is a binary search over the anchors and a
+    # short scan inside one block.
+    def __init__(self):
+        self._anchors = array.array('l')
+        self._deltas = array.array('H')
+        self._mu = array.array('d')
+        self._rd_sq = array.array('d')
+        self._last = 0
+
+    def __len__(self):
+        return len(self._mu)
+
+    def append(self, date, mu, rd_sq=0.0):
+        day = date.toordinal()
+        if day < self._last:
+            raise ValueError('Rating changes must be recorded in order')
+
+        if len(self._mu) % BLOCK == 0:
+            self._anchors.append(day)
+            self._deltas.append(0)
+        else:
+            self._deltas.append(day - self._last)
+
+        self._mu.append(mu)
+        self._rd_sq.append(rd_sq)
+        self._last = day
+
+    def __iter__(self):
+        day = 0
+        for i in range(len(self._mu)):
+            day = self._anchors[i // BLOCK] if i % BLOCK == 0 else day + self._deltas[i]
+            yield datetime.date.fromordinal(day), self._mu[i], self._rd_sq[i]
+
+    def at(self, date):
+        # State at the end of the given day, None before the first change
+        day = date.toordinal()
+        b = bisect.bisect_right(self._anchors, day) - 1
+        if b < 0:
+            return None
+
+        i = b * BLOCK
+        cur = self._anchors[b]
+        end = min(len(self._mu), i + BLOCK)
+        while i + 1 < end and cur + self._deltas[i + 1] <= day:
+            i += 1
+            cur += self._deltas[i]
+
+        return datetime.date.fromordinal(cur), self._mu[i], self._rd_sq[i]
+
+
+class History:
+    def __init__(self):
+        self.players = {}
+        self.factions = {}
+
+    @staticmethod
+    def _record(timelines, key, r, date):
+        if key not in timelines:
+            timelines[key] = Timeline()
+
+        timelines[key].append(date, r.mu, getattr(r, 'rdSq', 0.0))
+
+    def record(self, name, r, date):
+        History._record(self.players, name, r, date)
+
+    def record_faction(self, name, r, date):
+        History._record(self.factions, name, r, date)
+
+    def player(self, name):
+        return self.players.get(name)
+
+    def faction(self, name):
+        return self.factions.get(name)
+
+    def leaderboard(self, date, factions=False):
+        # (name, mu, rdSq) of everyone rated by the end of the day, best first
+        res = []
+        for key, timeline in (self.factions if factions else
+                              self.players).items():
+            state = timeline.at(date)
+            if state is not None:
+                res.append((key, state[1], state[2]))
+
+        res.sort(key=lambda r: (-r[1], r[0]))
+        return res
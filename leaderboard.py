@@ -0,0 +1,49 @@
+class Leaderboard:
+    # Names ordered by a sort key. Updates only collect the keys that
+    # changed, the next walk sorts those alone and merges them into the
+    # unchanged order: O(n + k log k) for k changed names instead of a full
+    # sort of all n.
+    def __init__(self):
+        self._order = []
+        self._key_of = {}
+        self._changed = {}
+
+    def __len__(self):
+        if self._changed:
+            self._merge()
+
+        return len(self._order)
+
+    def __contains__(self, name):
+        if name in self._changed:
+            return self._changed[name] is not None
+
+        return name in self._key_of
+
+    def __iter__(self):
+        if self._changed:
+            self._merge()
+
+        return (key[-1] for key in self._order)
+
+    def update(self, name, key):
+        key = key + (name, )
+        if self._changed.get(name, self._key_of.get(name)) != key:
+            self._changed[name] = key
+
+    def remove(self, name):
+        self._changed[name] = None
+
+    def _merge(self):
+        changed = self._changed
+        kept = [key for key in self._order if key[-1] not in changed]
+        kept += sorted(key for key in changed.values() if key is not None)
+        # Timsort finds the two sorted runs and merges them in linear time
+        kept.sort()
+        self._order = kept
+        for name, key in changed.items():
+            if key is None:
+                self._key_of.pop(name, None)
+            else:
+                self._key_of[name] = key
+        self._changed = {}
@@ -1,104 +1,165 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import checkpoints as cp
 import game_types as gt
+import manifest as mf
+import concurrent.futures
+import multiprocessing
+import match_store
+import profiling as pf
+import functools
 import datetime
 import glicko
 import glob
 import git
+import sys
 import elo
 import os
 
 NEW_DIFF_I = 1000000
 
-MILESTONES = (datetime.date(2019, 1, 1), datetime.date(2019, 4, 1),
-              datetime.date(2019, 7, 1), datetime.date(2019, 10, 1),
-              datetime.date(2020, 1, 1), datetime.date(2020, 4, 1))
-
-MILESTONE_LABELS = ('Q1 2020', '2019', 'Q3 2019', 'Q2 2019', 'Q1 2019', '2018')
-
-
-def format_player_info(p,
-                       r,
-                       rd=None,
-                       i=None,
-                       diff_i=None,
-                       diff_r=None,
-                       with_city=False):
-    res = [
-        '',
-    ]
-    if i != None:
-        res.append(str(i).rjust(3))
-    res.append(p.display.ljust(35))
-    if with_city:
-        res.append(p.city.ljust(10))
-    res.append(str('   N/A' if r is None else round(r, 2)).ljust(8))
-    if rd != None:
-        res.append(str(round(rd, 2)).ljust(7))
-    if diff_i != None:
-        if diff_i == NEW_DIFF_I:
-            res.append(' ---')
-        elif diff_i > 0:
-            res.append(('+' + str(diff_i)).rjust(4))
-        elif diff_i == 0:
-            res.append('    ')
-        else:
-            res.append(str(diff_i).rjust(4))
-    if diff_r != None:
-        if diff_r >= 0:
-            res.append(('+' + str(diff_i)).rjust(8))
-        else:
-            res.append(str(diff_i).rjust(8))
-    res.append('')
-    return '|'.join(res)
-
-
-def format_faction_info(f, r, rd=None, i=None, diff_i=None, diff_r=None):
-    res = [
-        '',
-    ]
-    if i != None:
-        res.append(str(i).rjust(3))
-    res.append(f.ljust(35))
-    res.append(str('   N/A' if r is None else round(r, 2)).ljust(8))
-    if rd != None:
-        res.append(str(round(rd, 2)).ljust(7))
-    if diff_i != None:
-        if diff_i == NEW_DIFF_I:
-            res.append(' ---')
-        elif diff_i > 0:
-            res.append(('+' + str(diff_i)).rjust(4))
-        elif diff_i == 0:
-            res.append('    ')
-        else:
-            res.append(str(diff_i).rjust(4))
-    if diff_r != None:
-        if diff_r >= 0:
-            res.append(('+' + str(diff_i)).rjust(8))
-        else:
-            res.append(str(diff_i).rjust(8))
-    res.append('')
-    return '|'.join(res)
-
-
-def export_rating(fname,
-                  label,
-                  tournaments,
-                  players,
-                  cur_date,
-                  player_check=None,
-                  tourney_check=None,
-                  top=None,
-                  with_milestones=False,
-                  with_city=False,
-                  min_n=6,
-                  filter_date=datetime.date(2020, 1, 1),
-                  max_rd_ratio=0.9,
-                  system=elo,
-                  with_factions=False,
-                  label_factions='',
-                  top_factions=None):
+
+def milestone_label(date):
+    # Label of the quarter (or the whole year) that ends at the milestone
+    if date.month == 1:
+        return str(date.year - 1)
+
+    return 'Q{} {}'.format((date.month - 2) // 3 + 1, date.year)
+
+
+MILESTONES_START = datetime.date(2019, 1, 1)
+
+
+def milestones(tournaments):
+    # Quarterly milestones up to the last counted event, so a new quarter
+    # gets its table once a match is played in the next one
+    last = max((t.date for t in tournaments), default=MILESTONES_START)
+    return gt.schedule(MILESTONES_START, last)
+
+
+def format_diff(diff_i):
+    if diff_i == NEW_DIFF_I:
+        return ' ---'
+    elif diff_i > 0:
+        return ('+' + str(diff_i)).rjust(4)
+    elif diff_i == 0:
+        return '    '
+    else:
+        return str(diff_i).rjust(4)
+
+
+class TableRenderer:
+    # Column layout of a rating table compiled into a single format string.
+    # Formatted rows are memoized, so a row shared by several files (e.g. the
+    # top of a -full and a -top25 table) is formatted only once.
+    def __init__(self, caption, with_city=False, with_rd=False,
+                 with_diff=False):
+        cap0 = '| # |{}|'.format(caption.ljust(35))
+        cap1 = '|---|-----------------------------------|'
+        fmt = '|{:>3}|{:<35}|'
+        if with_city:
+            cap0 += 'City      |'
+            cap1 += '----------|'
+            fmt += '{:<10}|'
+        cap0 += 'Rating  |'
+        cap1 += '--------|'
+        fmt += '{:<8}|'
+        if with_rd:
+            cap0 += 'StD    |'
+            cap1 += '-------|'
+            fmt += '{:<7}|'
+        if with_diff:
+            cap0 += ' +/-|'
+            cap1 += '----|'
+            fmt += '{}|'
+
+        self.header = (cap0, cap1)
+        self.caption = caption
+        self.with_city = with_city
+        self.with_rd = with_rd
+        self.with_diff = with_diff
+        self._fmt = fmt
+        self._rows = {}
+
+    def fields(self, pos, name, city, r, rd, diff_i):
+        fields = [str(pos), name]
+        if self.with_city:
+            fields.append(city)
+        fields.append(str('   N/A' if r is None else round(r, 2)))
+        if self.with_rd:
+            fields.append(str(round(rd, 2)))
+        if self.with_diff:
+            fields.append(format_diff(diff_i))
+
+        return fields
+
+    def row(self, pos, name, city, r, rd, diff_i):
+        key = (pos, name, city, r, rd, diff_i)
+        line = self._rows.get(key)
+        if line is None:
+            line = self._fmt.format(*self.fields(*key))
+            self._rows[key] = line
+
+        return line
+
+    def cells(self, rows, top=None):
+        # row() arguments of the shown rows, the place is left empty for
+        # every player but the first one sharing it
+        prev_pos = None
+        for pos, item, r, rd, diff_pos, _ in rows[:len(rows)
+                                                  if top is None else top]:
+            if isinstance(item, str):
+                name, city = item, None
+            else:
+                name, city = item.display, item.city if self.with_city else None
+            if not self.with_diff:
+                diff_pos = None
+            elif diff_pos is None:
+                diff_pos = NEW_DIFF_I
+            yield (pos if pos != prev_pos else '', name, city, r,
+                   rd if self.with_rd else None, diff_pos)
+            prev_pos = pos
+
+    def render(self, rows, top=None, lines=None):
+        lines = [] if lines is None else lines
+        lines.extend(self.header)
+
+        na = False
+        for cells in self.cells(rows, top):
+            lines.append(self.row(*cells))
+            if cells[3] is None:
+                na = True
+
+        return na
+
+
+@functools.lru_cache(maxsize=None)
+def get_renderer(caption, with_city=False, with_rd=False, with_diff=False):
+    return TableRenderer(caption, with_city, with_rd, with_diff)
+
+
+def rating_page(label,
+                engine,
+                players,
+                cur_date,
+                player_check=None,
+                tourney_check=None,
+                top=None,
+                with_milestones=False,
+                with_city=False,
+                min_n=6,
+                filter_date=datetime.date(2020, 1, 1),
+                max_rd_ratio=0.9,
+                system=elo,
+                with_factions=False,
+                label_factions='',
+                top_factions=None,
+                window=None):
+    # Content of a rating file: tables as (title, renderer, rows, top) from
+    # the latest date back to the oldest milestone, and the notes below them.
+    # With a window only matches of the last window months before each date
+    # count.
     try:
         r = system.Rating()
         _ = r.rdSq
@@ -106,290 +167,296 @@ def export_rating(fname,
     except AttributeError:
         with_rd = False
 
-    with open(fname, 'w') as log:
-        print(
-            '[К основным рейтингам](https://pee-kay.github.io/russian-wu-rating)',
-            file=log)
-
-        ratings, latest_date = tournaments.rate_players(
-            cur_date,
-            players,
-            player_check,
-            tourney_check,
-            sep=MILESTONES if with_milestones else (),
-            min_n=min_n,
-            filter_date=filter_date,
-            max_rd_ratio=max_rd_ratio,
-            system=system,
-            with_factions=with_factions)
-
-        print_na_info = False
-        for (rating, rating_factions), m_label in zip(
-                ratings[::-1],
-            ('{:02}.{:02}.{}'.format(latest_date.day, latest_date.month,
-                                     latest_date.year), ) + MILESTONE_LABELS):
-
-            if with_factions:
-                print('# {} {} #\n'.format(label_factions, m_label), file=log)
-
-                cap0 = '| # |Warband                            |'
-                cap1 = '|---|-----------------------------------|'
-                cap0 += 'Rating  |'
-                cap1 += '--------|'
-                if with_rd:
-                    cap0 += 'StD    |'
-                    cap1 += '-------|'
-                first = rating_factions is ratings[0][1]
-                if not first:
-                    cap0 += ' +/-|'
-                    cap1 += '----|'
-
-                print(cap0, file=log)
-                print(cap1, file=log)
-
-                prev_pos = None
-                for pos, f, r, rd, diff_pos, _ in rating_factions[:len(
-                        rating_factions
-                ) if top_factions is None else top_factions]:
-                    print(format_faction_info(
-                        f, r, rd if with_rd else None,
-                        pos if pos != prev_pos else '', None if first else
-                        (NEW_DIFF_I if diff_pos is None else diff_pos)),
-                        file=log)
-                    prev_pos = pos
-                    if r is None:
-                        print_na_info = True
-
-                print(file=log)
-
-            print('# {} {} #\n'.format(label, m_label), file=log)
-
-            cap0 = '| # |Player                             |'
-            cap1 = '|---|-----------------------------------|'
-            if with_city:
-                cap0 += 'City      |'
-                cap1 += '----------|'
-            cap0 += 'Rating  |'
-            cap1 += '--------|'
-            if with_rd:
-                cap0 += 'StD    |'
-                cap1 += '-------|'
-            first = rating is ratings[0][0]
-            if not first:
-                cap0 += ' +/-|'
-                cap1 += '----|'
-
-            print(cap0, file=log)
-            print(cap1, file=log)
-
-            prev_pos = None
-            for pos, p, r, rd, diff_pos, _ in rating[:len(rating)
-                                                     if top is None else top]:
-                print(format_player_info(p,
-                                         r,
-                                         rd if with_rd else None,
-                                         pos if pos != prev_pos else '',
-                                         None if first else
-                                         (NEW_DIFF_I if diff_pos is None else diff_pos),
-                                         with_city=with_city),
-                      file=log)
-                prev_pos = pos
-                if r is None:
-                    print_na_info = True
-
-            print(file=log)
-
+    ratings, latest_date = engine.rate_players(
+        cur_date,
+        players,
+        player_check,
+        tourney_check,
+        sep=engine.dates if with_milestones else (),
+        min_n=min_n,
+        filter_date=filter_date,
+        max_rd_ratio=max_rd_ratio,
+        system=system,
+        with_factions=with_factions,
+        window=window)
+
+    labels = ['{:02}.{:02}.{}'.format(latest_date.day, latest_date.month,
+                                      latest_date.year)]
+    if with_milestones:
+        labels.extend(milestone_label(d) for d in reversed(engine.dates))
+
+    tables = []
+    for (rating, rating_factions), m_label in zip(ratings[::-1], labels):
+
+        if with_factions:
+            first = rating_factions is ratings[0][1]
+            tables.append(('{} {}'.format(label_factions, m_label),
+                           get_renderer('Warband', False, with_rd, not first),
+                           rating_factions, top_factions))
+
+        first = rating is ratings[0][0]
+        tables.append(('{} {}'.format(label, m_label),
+                       get_renderer('Player', with_city, with_rd, not first),
+                       rating, top))
+
+    notes = []
+    if with_rd:
+        notes.append('StD - среднеквадратическое отклонение рейтинга')
+
+    if any(r is None for _, _, rows, top in tables
+           for _, _, r, _, _, _ in rows[:len(rows) if top is None else top]):
         if with_rd:
-            print('StD - среднеквадратическое отклонение рейтинга', file=log)
-
-        if print_na_info:
-            if with_rd:
-                print(
-                    'N/A - недостаточно определенный или устаревший рейтинг (StD < {})'
-                    .format(round(system.MAX_RD * max_rd_ratio)),
-                    file=log)
-            else:
-                print(
-                    'N/A - недостаточно матчей для определения рейтинга (<{})'.
-                    format(min_n),
-                    file=log)
-
-        print(
-            '\n---\n\n[К основным рейтингам](https://pee-kay.github.io/russian-wu-rating)',
-            file=log)
+            notes.append(
+                'N/A - недостаточно определенный или устаревший рейтинг (StD < {})'
+                .format(round(system.MAX_RD * max_rd_ratio)))
+        else:
+            notes.append(
+                'N/A - недостаточно матчей для определения рейтинга (<{})'.
+                format(min_n))
+
+    return tables, notes
+
+
+def export_rating(fname, label, engine, players, cur_date, **kwargs):
+    with pf.stage('view ' + os.path.basename(fname)):
+        tables, notes = rating_page(label, engine, players, cur_date,
+                                    **kwargs)
+
+        with pf.stage('render'):
+            lines = [
+                '[К основным рейтингам](https://pee-kay.github.io/russian-wu-rating)'
+            ]
+            for title, renderer, rows, top in tables:
+                lines.append('# {} #\n'.format(title))
+                renderer.render(rows, top, lines=lines)
+                lines.append('')
+
+            lines.extend(notes)
+            lines.append(
+                '\n---\n\n[К основным рейтингам](https://pee-kay.github.io/russian-wu-rating)'
+            )
+
+        with pf.stage('write'):
+            tmp_fname = fname + '.tmp'
+            with open(tmp_fname, 'w') as log:
+                log.write('\n'.join(lines) + '\n')
+            os.replace(tmp_fname, fname)
+
+
+# Rating files written by main. Keys are export_rating arguments, except
+# for the filters: city limits the listed players, org and with_glass limit
+# the counted tournaments. A window (in months) rates each table by the
+# matches played in the window before its date.
+VIEWS = (
+    dict(fname='combined-top25-top10.md',
+         label='Топ25 игроков',
+         with_milestones=True,
+         with_city=True,
+         top=25,
+         with_factions=True,
+         label_factions='Топ10 банд',
+         top_factions=10),
+    dict(fname='combined-full.md',
+         label='Текущий рейтинг игроков',
+         with_city=True,
+         with_factions=True,
+         label_factions='Текущий рейтинг банд'),
+    dict(fname='glass-tournaments-top25.md',
+         label='Топ25 игроков России (по турнирам со стеклом)',
+         with_milestones=True,
+         with_city=True,
+         top=25,
+         with_glass=True,
+         min_n=3),
+    dict(fname='russian-top25.md',
+         label='Топ25 игроков России',
+         with_milestones=True,
+         with_city=True,
+         top=25),
+    dict(fname='russian-full.md',
+         label='Текущий рейтинг игроков России',
+         with_city=True),
+    dict(fname='moscow-top25.md',
+         label='Топ25 игроков Москвы',
+         with_milestones=True,
+         top=25,
+         city='Msk'),
+    dict(fname='moscow-full.md',
+         label='Текущий рейтинг игроков Москвы',
+         city='Msk'),
+    dict(fname='spb-top25.md',
+         label='Топ25 игроков Санкт-Петербурга',
+         with_milestones=True,
+         top=25,
+         city='SPb'),
+    dict(fname='spb-full.md',
+         label='Текущий рейтинг игроков Санкт-Петербурга',
+         city='SPb'),
+    dict(fname='shade-city-top25.md',
+         label='Топ25 игроков турниров Shade City',
+         with_milestones=True,
+         with_city=True,
+         top=25,
+         org='Святослав Соколов',
+         min_n=3),
+    dict(fname='shade-city-full.md',
+         label='Текущий рейтинг игроков турниров Shade City',
+         with_city=True,
+         org='Святослав Соколов',
+         min_n=3),
+    dict(fname='russian-top25-glicko.md',
+         label='Топ25 игроков России (Glicko)',
+         with_milestones=True,
+         with_city=True,
+         top=25,
+         system=glicko),
+    dict(fname='russian-full-glicko.md',
+         label='Текущий рейтинг игроков России (Glicko)',
+         with_city=True,
+         system=glicko),
+    dict(fname='moscow-top25-glicko.md',
+         label='Топ25 игроков Москвы (Glicko)',
+         with_milestones=True,
+         top=25,
+         city='Msk',
+         system=glicko),
+    dict(fname='moscow-full-glicko.md',
+         label='Текущий рейтинг игроков Москвы (Glicko)',
+         city='Msk',
+         system=glicko),
+    dict(fname='spb-top25-glicko.md',
+         label='Топ25 игроков Санкт-Петербурга (Glicko)',
+         with_milestones=True,
+         top=25,
+         city='SPb',
+         system=glicko),
+    dict(fname='spb-full-glicko.md',
+         label='Текущий рейтинг игроков Санкт-Петербурга (Glicko)',
+         city='SPb',
+         system=glicko),
+)
+
+
+def view_checks(city=None, org=None, with_glass=False):
+    player_check = None
+    if city is not None:
+        player_check = lambda p: p.city == city
+
+    tourney_check = None
+    if org is not None:
+        tourney_check = lambda t: t.org == org
+    elif with_glass:
+        tourney_check = lambda t: t.with_glass
+
+    return player_check, tourney_check
+
+
+def view_args(view):
+    # (fname, label, rating_page keyword arguments) of a VIEWS entry
+    view = dict(view)
+    fname = view.pop('fname')
+    label = view.pop('label')
+    view['player_check'], view['tourney_check'] = view_checks(
+        view.pop('city', None), view.pop('org', None),
+        view.pop('with_glass', False))
+    return fname, label, view
+
+
+def export_view(view, engine, players, cur_date, output='output'):
+    fname, label, kwargs = view_args(view)
+    export_rating(os.path.join(output, fname), label, engine, players,
+                  cur_date, **kwargs)
+
+
+# Set by export_all right before the workers are forked
+_shared = None
+
+
+def _export_job(i):
+    views, engine, players, cur_date, output = _shared
+    pf.PROFILER.stages = {}
+    export_view(views[i], engine, players, cur_date, output)
+    return pf.PROFILER.stages
+
+
+def export_all(views, engine, players, cur_date, output='output',
+               workers=None):
+    # Replays are done up front, forked workers then share them (and the
+    # loaded tournaments) with this process and only rank and render.
+    global _shared
+
+    for view in views:
+        engine.prepare(view.get('system', elo),
+                       view_checks(org=view.get('org'),
+                                   with_glass=view.get('with_glass',
+                                                       False))[1],
+                       view.get('with_factions', False),
+                       view.get('window'))
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if (workers == 1 or len(views) < 2
+            or 'fork' not in multiprocessing.get_all_start_methods()):
+        for view in views:
+            export_view(view, engine, players, cur_date, output)
+        return
+
+    _shared = (views, engine, players, cur_date, output)
+    try:
+        with concurrent.futures.ProcessPoolExecutor(
+                min(workers, len(views)),
+                mp_context=multiprocessing.get_context('fork')) as executor:
+            for stages in executor.map(_export_job, range(len(views))):
+                pf.PROFILER.merge(stages)
+    finally:
+        _shared = None
 
 
-def main():
+def commit_date():
+    # Ratings are published as of the HEAD commit of the data repository
     repo = git.Repo(os.path.dirname(__file__))
-    cur_date = datetime.date.fromtimestamp(repo.head.commit.committed_date)
+    return datetime.date.fromtimestamp(repo.head.commit.committed_date)
 
-    players_fname = 'players.csv'
-    players = gt.Player.load_players(players_fname)
 
+def load_tournaments(registry):
     tournaments = gt.Tournaments()
 
-    for fname in glob.glob('tournaments/*.csv'):
-        tournaments.load_tournament(fname, players_fname)
+    with pf.stage('manifest'):
+        events = mf.Manifest.scan(sorted(glob.glob('tournaments/*.csv')),
+                                  sorted(glob.glob('leagues/*.csv')),
+                                  mf.MANIFEST_FNAME)
+    with pf.stage('load', lambda: gt.count_matches(tournaments)):
+        match_store.load(tournaments,
+                         events.tournament_fnames,
+                         events.league_fnames,
+                         registry=registry)
+
+    return tournaments
 
-    for fname in glob.glob('leagues/*.csv'):
-        tournaments.load_league(fname, players_fname)
+
+def main():
+    report, cprofile = pf.from_env(sys.argv[1:])
+
+    cur_date = commit_date()
+
+    with pf.stage('registry'):
+        registry = gt.Registry('players.csv', 'factions.csv')
+        players = registry.players
+        registry.factions
+
+    tournaments = load_tournaments(registry)
 
     if not os.path.exists('output'):
         os.mkdir('output')
 
-    export_rating('output/combined-top25-top10.md',
-                  'Топ25 игроков',
-                  tournaments,
-                  players,
-                  cur_date,
-                  with_milestones=True,
-                  with_city=True,
-                  top=25,
-                  with_factions=True,
-                  label_factions='Топ10 банд',
-                  top_factions=10)
-
-    export_rating('output/combined-full.md',
-                  'Текущий рейтинг игроков',
-                  tournaments,
-                  players,
-                  cur_date,
-                  with_city=True,
-                  with_factions=True,
-                  label_factions='Текущий рейтинг банд')
-
-    export_rating('output/glass-tournaments-top25.md',
-                  'Топ25 игроков России (по турнирам со стеклом)',
-                  tournaments,
-                  players,
-                  cur_date,
-                  with_milestones=True,
-                  with_city=True,
-                  top=25,
-                  tourney_check=lambda t: t.with_glass,
-                  min_n=3)
-
-    export_rating('output/russian-top25.md',
-                  'Топ25 игроков России',
-                  tournaments,
-                  players,
-                  cur_date,
-                  with_milestones=True,
-                  with_city=True,
-                  top=25)
-
-    export_rating('output/russian-full.md',
-                  'Текущий рейтинг игроков России',
-                  tournaments,
-                  players,
-                  cur_date,
-                  with_city=True)
-
-    export_rating('output/moscow-top25.md',
-                  'Топ25 игроков Москвы',
-                  tournaments,
-                  players,
-                  cur_date,
-                  with_milestones=True,
-                  top=25,
-                  player_check=lambda p: p.city == 'Msk')
-
-    export_rating('output/moscow-full.md',
-                  'Текущий рейтинг игроков Москвы',
-                  tournaments,
-                  players,
-                  cur_date,
-                  player_check=lambda p: p.city == 'Msk')
-
-    export_rating('output/spb-top25.md',
-                  'Топ25 игроков Санкт-Петербурга',
-                  tournaments,
-                  players,
-                  cur_date,
-                  with_milestones=True,
-                  top=25,
-                  player_check=lambda p: p.city == 'SPb')
-
-    export_rating('output/spb-full.md',
-                  'Текущий рейтинг игроков Санкт-Петербурга',
-                  tournaments,
-                  players,
-                  cur_date,
-                  player_check=lambda p: p.city == 'SPb')
-
-    export_rating('output/shade-city-top25.md',
-                  'Топ25 игроков турниров Shade City',
-                  tournaments,
-                  players,
-                  cur_date,
-                  with_milestones=True,
-                  with_city=True,
-                  top=25,
-                  tourney_check=lambda t: t.org == 'Святослав Соколов',
-                  min_n=3)
-
-    export_rating('output/shade-city-full.md',
-                  'Текущий рейтинг игроков турниров Shade City',
-                  tournaments,
-                  players,
-                  cur_date,
-                  with_city=True,
-                  tourney_check=lambda t: t.org == 'Святослав Соколов',
-                  min_n=3)
-
-    export_rating('output/russian-top25-glicko.md',
-                  'Топ25 игроков России (Glicko)',
-                  tournaments,
-                  players,
-                  cur_date,
-                  with_milestones=True,
-                  with_city=True,
-                  top=25,
-                  system=glicko)
-
-    export_rating('output/russian-full-glicko.md',
-                  'Текущий рейтинг игроков России (Glicko)',
-                  tournaments,
-                  players,
-                  cur_date,
-                  with_city=True,
-                  system=glicko)
-
-    export_rating('output/moscow-top25-glicko.md',
-                  'Топ25 игроков Москвы (Glicko)',
-                  tournaments,
-                  players,
-                  cur_date,
-                  with_milestones=True,
-                  top=25,
-                  player_check=lambda p: p.city == 'Msk',
-                  system=glicko)
-
-    export_rating('output/moscow-full-glicko.md',
-                  'Текущий рейтинг игроков Москвы (Glicko)',
-                  tournaments,
-                  players,
-                  cur_date,
-                  player_check=lambda p: p.city == 'Msk',
-                  system=glicko)
-
-    export_rating('output/spb-top25-glicko.md',
-                  'Топ25 игроков Санкт-Петербурга (Glicko)',
-                  tournaments,
-                  players,
-                  cur_date,
-                  with_milestones=True,
-                  top=25,
-                  player_check=lambda p: p.city == 'SPb',
-                  system=glicko)
-
-    export_rating('output/spb-full-glicko.md',
-                  'Текущий рейтинг игроков Санкт-Петербурга (Glicko)',
-                  tournaments,
-                  players,
-                  cur_date,
-                  player_check=lambda p: p.city == 'SPb',
-                  system=glicko)
+    engine = gt.RatingEngine(tournaments, milestones(tournaments),
+                             cp.Checkpoints())
+
+    export_all(VIEWS, engine, players, cur_date)
+
+    if report:
+        pf.PROFILER.report(report, cprofile)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import game_types as gt
+import datetime
+import glob
+import csv
+import os
+
+MANIFEST_FNAME = 'events.csv'
+
+
+class EventInfo:
+    # Mirrors the metadata properties of Tournament, so tourney_check
+    # predicates can be applied before the event file is loaded.
+    def __init__(self, fname, league, date, name, org, city, tt='LG'):
+        self.fname = fname
+        self.league = league
+        self.date = datetime.date(*date)
+        self.name = name
+        self.org = org
+        self.city = city
+        self.tt = tt
+
+    def __repr__(self):
+        return 'EventInfo({}, {}, {})'.format(repr(self.fname),
+                                              repr(self.date), repr(self.tt))
+
+    @staticmethod
+    def from_fname(fname, league=False):
+        params = gt.parse_metadata(fname, league)
+        return EventInfo(fname, league, *params)
+
+    @property
+    def rank(self):
+        return gt.RANKS[self.tt]
+
+    @property
+    def with_glass(self):
+        return self.rank >= 2
+
+    @property
+    def is_grand_clash(self):
+        return self.rank >= 3
+
+
+class Manifest(list):
+    @staticmethod
+    def scan(tournament_fnames, league_fnames, fname=None):
+        # Metadata is derived from the event file name, so an entry can't go
+        # stale while the file keeps its name.
+        known = {}
+        if fname is not None and os.path.exists(fname):
+            for info in Manifest.load(fname):
+                known[info.fname] = info
+
+        events = Manifest()
+        for fnames, league in ((tournament_fnames, False), (league_fnames,
+                                                            True)):
+            for f in fnames:
+                info = known.get(f)
+                if info is None or info.league != league:
+                    info = EventInfo.from_fname(f, league)
+                events.append(info)
+
+        # Events of one date load in file name order, whatever order the
+        # file system lists them in
+        events.sort(key=lambda info: (info.date, info.fname))
+        return events
+
+    @staticmethod
+    def load(fname):
+        events = Manifest()
+        with open(fname, 'r') as csvf:
+            rdr = csv.reader(csvf)
+            for i, l in enumerate(rdr):
+                if i == 0:
+                    continue
+
+                f, year, month, day, name, org, city, tt = l
+                events.append(
+                    EventInfo(f, tt == 'LG', (int(year), int(month), int(day)),
+                              name, org, city, tt))
+
+        return events
+
+    def save(self, fname):
+        with open(fname, 'w') as csvf:
+            wrt = csv.writer(csvf)
+            wrt.writerow(('File', 'Year', 'Month', 'Day', 'Name', 'Org',
+                          'City', 'Type'))
+            for info in self:
+                wrt.writerow((info.fname, info.date.year, info.date.month,
+                              info.date.day, info.name, info.org, info.city,
+                              info.tt))
+
+    def select(self,
+               tourney_check=None,
+               since=None,
+               until=None,
+               org=None,
+               city=None,
+               min_rank=None):
+        # Events passing all given filters, decided on the metadata alone
+        return Manifest(
+            info for info in self
+            if (tourney_check is None or tourney_check(info)) and (
+                since is None or info.date >= since) and (
+                    until is None or info.date <= until) and (
+                        org is None or info.org == org) and (
+                            city is None or info.city == city) and (
+                                min_rank is None or info.rank >= min_rank))
+
+    @property
+    def tournament_fnames(self):
+        return [info.fname for info in self if not info.league]
+
+    @property
+    def league_fnames(self):
+        return [info.fname for info in self if info.league]
+
+
+def main():
+    events = Manifest.scan(sorted(glob.glob('tournaments/*.csv')),
+                           sorted(glob.glob('leagues/*.csv')), MANIFEST_FNAME)
+    events.save(MANIFEST_FNAME)
+    print('{} events indexed in {}'.format(len(events), MANIFEST_FNAME))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,271 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import checkpoints as cp
+import game_types as gt
+import array
+import mmap
+import glob
+import sys
+import os
+
+STORE_FNAME = '.matches.bin'
+
+MAGIC = b'WUMS'
+VERSION = 1
+
+# Every table is a flat int32 array with a fixed number of columns, strings
+# are referenced by their index in the string table, -1 stands for None.
+EVENT_COLS = 13  # kind, year, month, day, name, org, city, tt, fname, hash,
+#                  tour count, first seat, first match
+SEAT_COLS = 3  # key, player, faction
+MATCH_COLS = 7  # tour, p1 key, p2 key, result, yyyymmdd, f1, f2
+
+KINDS = ('tournament', 'league')
+
+
+class StringTable:
+    def __init__(self):
+        self.strings = []
+        self._ids = {}
+
+    def __call__(self, s):
+        if s is None:
+            return -1
+
+        if s not in self._ids:
+            self._ids[s] = len(self.strings)
+            self.strings.append(s)
+
+        return self._ids[s]
+
+
+def write_store(fname, records, fnames, depends):
+    sid = StringTable()
+    meta = array.array('i', [sid(d) for d in depends])
+    events = array.array('i')
+    seats = array.array('i')
+    matches = array.array('i')
+
+    for record, source_fname in zip(records, fnames):
+        (kind, params, tourney_players, tourney_factions, tourney_matches,
+         source_hash) = record
+        date, name, org, city = params[:4]
+        league = kind == 'league'
+
+        events.extend((KINDS.index(kind), date[0], date[1], date[2],
+                       sid(name), sid(org), sid(city),
+                       -1 if league else sid(params[4]), sid(source_fname),
+                       sid(source_hash),
+                       0 if league else len(tourney_matches),
+                       len(seats) // SEAT_COLS, len(matches) // MATCH_COLS))
+
+        for key, player in tourney_players.items():
+            faction = None if league else tourney_factions.get(key)
+            seats.extend((sid(str(key)), sid(player), sid(faction)))
+
+        if league:
+            for p1, p2, (year, month, day), f1, f2 in tourney_matches:
+                matches.extend((0, sid(p1), sid(p2), 1,
+                                year * 10000 + month * 100 + day, sid(f1),
+                                sid(f2)))
+        else:
+            for tour, tour_matches in enumerate(tourney_matches):
+                for i1, i2, res in tour_matches:
+                    matches.extend(
+                        (tour, sid(str(i1)), sid(str(i2)), res, 0, -1, -1))
+
+    blob = bytearray()
+    offsets = array.array('i', [0])
+    for s in sid.strings:
+        blob += s.encode('utf-8')
+        offsets.append(len(blob))
+
+    tmp_fname = fname + '.tmp'
+    with open(tmp_fname, 'wb') as f:
+        f.write(MAGIC)
+        f.write(array.array('i', [VERSION, sys.byteorder == 'little']))
+        for table in (meta, events, seats, matches, offsets):
+            f.write(array.array('q', [len(table)]))
+            f.write(table)
+        f.write(array.array('q', [len(blob)]))
+        f.write(blob)
+
+    os.replace(tmp_fname, fname)
+
+
+class MatchStore:
+    def __init__(self, fname):
+        with open(fname, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        buf = memoryview(self._mm)
+        self._views = [buf]
+        if bytes(buf[:4]) != MAGIC:
+            self.close()
+            raise ValueError('{} is not a match store'.format(fname))
+
+        header = self._view(4, 12, 'i')
+        if header[0] != VERSION or header[1] != (sys.byteorder == 'little'):
+            self.close()
+            raise ValueError('{} has incompatible format'.format(fname))
+
+        pos = 12
+        tables = []
+        for fmt in 'iiiiiB':
+            n = self._view(pos, pos + 8, 'q')[0]
+            size = n * (1 if fmt == 'B' else 4)
+            tables.append(self._view(pos + 8, pos + 8 + size, fmt))
+            pos += 8 + size
+
+        (self._meta, self._events, self._seats, self._matches, self._offsets,
+         self._blob) = tables
+        self._strings = [None] * (len(self._offsets) - 1)
+
+    def _view(self, start, end, fmt):
+        view = self._views[0][start:end].cast(fmt)
+        self._views.append(view)
+        return view
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        for view in self._views[::-1]:
+            view.release()
+        self._views = []
+        self._mm.close()
+
+    def string(self, i):
+        if i < 0:
+            return None
+
+        if self._strings[i] is None:
+            self._strings[i] = str(
+                self._blob[self._offsets[i]:self._offsets[i + 1]], 'utf-8')
+
+        return self._strings[i]
+
+    @property
+    def depends(self):
+        return [self.string(i) for i in self._meta]
+
+    def __len__(self):
+        return len(self._events) // EVENT_COLS
+
+    def source(self, e):
+        ev = self._events[e * EVENT_COLS:(e + 1) * EVENT_COLS]
+        return self.string(ev[8]), self.string(ev[9])
+
+    def record(self, e):
+        s = self.string
+        ev = self._events[e * EVENT_COLS:(e + 1) * EVENT_COLS]
+        kind = KINDS[ev[0]]
+        league = kind == 'league'
+        date = (ev[1], ev[2], ev[3])
+
+        if e + 1 < len(self):
+            seat_end = self._events[(e + 1) * EVENT_COLS + 11]
+            match_end = self._events[(e + 1) * EVENT_COLS + 12]
+        else:
+            seat_end = len(self._seats) // SEAT_COLS
+            match_end = len(self._matches) // MATCH_COLS
+
+        tourney_players = {}
+        tourney_factions = None if league else {}
+        for i in range(ev[11], seat_end):
+            key, player, faction = self._seats[i * SEAT_COLS:(i + 1) *
+                                               SEAT_COLS]
+            key = s(key) if league else int(s(key))
+            tourney_players[key] = s(player)
+            if faction >= 0:
+                tourney_factions[key] = s(faction)
+
+        if league:
+            params = (date, s(ev[4]), s(ev[5]), s(ev[6]))
+            matches = []
+        else:
+            params = (date, s(ev[4]), s(ev[5]), s(ev[6]), s(ev[7]))
+            matches = [[] for _ in range(ev[10])]
+
+        for i in range(ev[12], match_end):
+            tour, p1, p2, res, ymd, f1, f2 = self._matches[i * MATCH_COLS:
+                                                           (i + 1) *
+                                                           MATCH_COLS]
+            if league:
+                matches.append(
+                    (s(p1), s(p2), (ymd // 10000, ymd // 100 % 100,
+                                    ymd % 100), s(f1), s(f2)))
+            else:
+                matches[tour].append((int(s(p1)), int(s(p2)), res))
+
+        return (kind, params, tourney_players, tourney_factions, matches,
+                s(ev[9]))
+
+
+def load(tournaments,
+         tournament_fnames=(),
+         league_fnames=(),
+         store_fname=STORE_FNAME,
+         registry=None,
+         workers=None):
+    if registry is None:
+        registry = gt.Registry.shared()
+
+    # The parser is part of the key, so changes to it rebuild the store
+    depends = [
+        cp.file_hash(registry.players_fname),
+        cp.file_hash(registry.factions_fname),
+        cp.file_hash(gt.__file__)
+    ]
+
+    fnames = list(tournament_fnames) + list(league_fnames)
+    records = {}
+    stored = {}
+    if os.path.exists(store_fname):
+        try:
+            with MatchStore(store_fname) as store:
+                if store.depends == depends:
+                    for e in range(len(store)):
+                        stored[store.source(e)[0]] = store.record(e)
+        except (ValueError, TypeError, IndexError):
+            stored = {}
+
+    for fname in fnames:
+        record = stored.get(fname)
+        if record is not None and record[-1] == cp.file_hash(fname):
+            records[fname] = record
+
+    changed_tournaments = [f for f in tournament_fnames if f not in records]
+    changed_leagues = [f for f in league_fnames if f not in records]
+    records.update(
+        zip(changed_tournaments + changed_leagues,
+            gt.parse_all(changed_tournaments,
+                         changed_leagues,
+                         registry=registry,
+                         workers=workers)))
+
+    # A load of a few selected events keeps the records of the others, so
+    # the store still serves the next full load. Stale ones are caught by
+    # their source hash then.
+    if changed_tournaments or changed_leagues:
+        kept = [f for f in stored if f not in records and os.path.exists(f)]
+        write_store(store_fname, [records[f] for f in fnames] +
+                    [stored[f] for f in kept], fnames + kept, depends)
+
+    for fname in fnames:
+        tournaments.add_record(records[fname])
+
+
+def main():
+    tournaments = gt.Tournaments()
+    load(tournaments, sorted(glob.glob('tournaments/*.csv')),
+         sorted(glob.glob('leagues/*.csv')))
+    print('{} events compiled into {}'.format(len(tournaments), STORE_FNAME))
+
+
+if __name__ == '__main__':
+    main()
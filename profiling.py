@@ -0,0 +1,138 @@
+import contextlib
+import tracemalloc
+import cProfile
+import time
+import json
+import os
+
+
+class Stage:
+    __slots__ = ('calls', 'seconds', 'matches', 'peak')
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.matches = 0
+        self.peak = 0
+
+    def as_dict(self):
+        rate = None
+        if self.matches and self.seconds:
+            rate = self.matches / self.seconds
+
+        return {
+            'calls': self.calls,
+            'seconds': self.seconds,
+            'matches': self.matches,
+            'matches_per_second': rate,
+            'peak_memory': self.peak
+        }
+
+
+class Profiler:
+    # Wall time, calls, processed matches and peak traced memory per named
+    # stage. Stages may nest: a nested stage also counts towards the outer
+    # one, and peaks are carried over to the outer stage when it resumes.
+    # Disabled profiler stages cost a single check.
+    def __init__(self):
+        self.enabled = False
+        self.stages = {}
+        self._peaks = []
+        self._cprofile = None
+        self._hot = 0
+
+    def start(self, cprofile=False):
+        self.enabled = True
+        tracemalloc.start()
+        if cprofile:
+            self._cprofile = cProfile.Profile()
+
+    @contextlib.contextmanager
+    def stage(self, name, matches=None, hot=False):
+        if not self.enabled:
+            yield
+            return
+
+        if self._peaks:
+            self._peaks[-1] = max(self._peaks[-1],
+                                  tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+        self._peaks.append(0)
+
+        hot = hot and self._cprofile is not None
+        if hot:
+            if self._hot == 0:
+                self._cprofile.enable()
+            self._hot += 1
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            if hot:
+                self._hot -= 1
+                if self._hot == 0:
+                    self._cprofile.disable()
+
+            peak = max(self._peaks.pop(), tracemalloc.get_traced_memory()[1])
+            if self._peaks:
+                self._peaks[-1] = max(self._peaks[-1], peak)
+            tracemalloc.reset_peak()
+
+            s = self.stages.get(name)
+            if s is None:
+                s = self.stages[name] = Stage()
+            s.calls += 1
+            s.seconds += seconds
+            s.matches += matches() if callable(matches) else (matches or 0)
+            s.peak = max(s.peak, peak)
+
+    def merge(self, stages):
+        # Adds up stages recorded by another (e.g. a worker) process
+        for name, other in stages.items():
+            s = self.stages.get(name)
+            if s is None:
+                s = self.stages[name] = Stage()
+            s.calls += other.calls
+            s.seconds += other.seconds
+            s.matches += other.matches
+            s.peak = max(s.peak, other.peak)
+
+    def report(self, fname, cprofile_fname=None):
+        with open(fname, 'w') as f:
+            json.dump({name: s.as_dict()
+                       for name, s in self.stages.items()},
+                      f,
+                      indent=2,
+                      ensure_ascii=False)
+
+        if self._cprofile is not None and cprofile_fname is not None:
+            self._cprofile.dump_stats(cprofile_fname)
+
+
+PROFILER = Profiler()
+
+
+def stage(name, matches=None, hot=False):
+    return PROFILER.stage(name, matches, hot)
+
+
+def from_env(argv=()):
+    # --profile / WU_PROFILE=report.json enable the report, --cprofile /
+    # WU_CPROFILE=replay.prof also dump cProfile stats of the rating replay.
+    # Returns the file names to pass to report() at exit.
+    report = os.environ.get('WU_PROFILE')
+    cprofile = os.environ.get('WU_CPROFILE')
+    if '--profile' in argv and not report:
+        report = 'profile.json'
+    if '--cprofile' in argv and not cprofile:
+        cprofile = 'replay.prof'
+
+    if cprofile and not report:
+        report = 'profile.json'
+
+    if report:
+        PROFILER.start(bool(cprofile))
+
+    return report, cprofile
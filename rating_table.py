@@ -0,0 +1,262 @@
+import numpy as np
+import importlib
+import datetime
+
+COLUMNS = ('mu', 'n', 'rdSq', 'last_active')
+
+
+class RatingTable:
+    # Rating state of many players (or factions) in parallel arrays. Keys are
+    # interned to row indices in the order they are first seen, last_active
+    # holds date ordinals with 0 standing for None. Other Rating slots of
+    # the system (e.g. a volatility) get float columns of their own. Only
+    # the batch and rating period replays use tables.
+    def __init__(self, system, capacity=64):
+        r = system.Rating()
+        self.system = system
+        self.extra = tuple(a for a in getattr(system.Rating, '__slots__', ())
+                           if a not in COLUMNS)
+        self._default = (r.mu, r.n, getattr(r, 'rdSq', 0.0)) + tuple(
+            getattr(r, a) for a in self.extra)
+        self.ids = {}
+        self.keys = []
+        self.mu = np.empty(capacity)
+        self.n = np.empty(capacity, dtype=np.int64)
+        self.rdSq = np.empty(capacity)
+        self.last_active = np.empty(capacity, dtype=np.int64)
+        for attr in self.extra:
+            setattr(self, attr, np.empty(capacity))
+
+    @property
+    def columns(self):
+        return COLUMNS + self.extra
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return key in self.ids
+
+    def __iter__(self):
+        return iter(self.keys)
+
+    def __getitem__(self, key):
+        return RatingView(self, self.ids[key])
+
+    def items(self):
+        return ((key, RatingView(self, i)) for i, key in enumerate(self.keys))
+
+    def copy(self):
+        n = len(self.keys)
+        table = RatingTable.__new__(RatingTable)
+        table.system = self.system
+        table.extra = self.extra
+        table._default = self._default
+        table.ids = dict(self.ids)
+        table.keys = list(self.keys)
+        for attr in self.columns:
+            setattr(table, attr, getattr(self, attr)[:max(n, 1)].copy())
+
+        return table
+
+    def __getstate__(self):
+        n = len(self.keys)
+        return (self.system.__name__, self.keys,
+                {attr: getattr(self, attr)[:n]
+                 for attr in self.columns})
+
+    def __setstate__(self, state):
+        system, keys, columns = state
+        self.__init__(importlib.import_module(system), max(len(keys), 1))
+        self.keys = list(keys)
+        self.ids = dict(zip(self.keys, range(len(self.keys))))
+        for attr, values in columns.items():
+            getattr(self, attr)[:len(keys)] = values
+
+    def _grow(self):
+        capacity = 2 * len(self.mu)
+        for attr in self.columns:
+            old = getattr(self, attr)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, attr, new)
+
+    def intern(self, key):
+        i = self.ids.get(key)
+        if i is None:
+            i = len(self.keys)
+            if i == len(self.mu):
+                self._grow()
+
+            self.ids[key] = i
+            self.keys.append(key)
+            self.mu[i], self.n[i], self.rdSq[i] = self._default[:3]
+            for attr, value in zip(self.extra, self._default[3:]):
+                getattr(self, attr)[i] = value
+            self.last_active[i] = 0
+
+        return i
+
+    def rows(self, keys):
+        # Row indices of keys as an array, unknown keys are interned first
+        for key in dict.fromkeys(keys):
+            if key not in self.ids:
+                self.intern(key)
+
+        return np.fromiter(map(self.ids.__getitem__, keys), np.int64,
+                           len(keys))
+
+    @staticmethod
+    def from_ratings(system, ratings):
+        table = RatingTable(system, max(64, len(ratings)))
+        for key, r in ratings.items():
+            i = table.intern(key)
+            table.mu[i] = r.mu
+            table.n[i] = r.n
+            table.rdSq[i] = getattr(r, 'rdSq', 0.0)
+            for attr in table.extra:
+                getattr(table, attr)[i] = getattr(r, attr)
+            table.last_active[i] = (0 if r.last_active is None else
+                                    r.last_active.toordinal())
+
+        return table
+
+    def to_ratings(self):
+        ratings = {}
+        for i, key in enumerate(self.keys):
+            r = self.system.Rating()
+            r.mu = float(self.mu[i])
+            r.n = int(self.n[i])
+            if hasattr(r, 'rdSq'):
+                r.rdSq = float(self.rdSq[i])
+            for attr in self.extra:
+                setattr(r, attr, float(getattr(self, attr)[i]))
+            last_active = int(self.last_active[i])
+            r.last_active = datetime.date.fromordinal(
+                last_active) if last_active else None
+            ratings[key] = r
+
+        return ratings
+
+
+class RatingView:
+    # Lightweight read-only Rating for code that still wants objects, it
+    # stays bound to a row of the table.
+    __slots__ = ('_table', '_i')
+
+    def __init__(self, table, i):
+        self._table = table
+        self._i = i
+
+    @property
+    def mu(self):
+        return float(self._table.mu[self._i])
+
+    @property
+    def n(self):
+        return int(self._table.n[self._i])
+
+    @property
+    def rdSq(self):
+        return float(self._table.rdSq[self._i])
+
+    @property
+    def last_active(self):
+        last_active = int(self._table.last_active[self._i])
+        return datetime.date.fromordinal(last_active) if last_active else None
+
+    def __getattr__(self, attr):
+        if attr in self._table.extra:
+            return float(getattr(self._table, attr)[self._i])
+
+        raise AttributeError(attr)
+
+    def getRdSq(self, date=None):
+        return self._table.system.Rating.getRdSq(self, date)
+
+
+MIN_WAVE = 20
+
+
+class Schedule:
+    # Matches of a replay grouped into waves for the batch kernels, which
+    # update every row at most once. A match goes to the wave right after
+    # the last one of its players, so each rating sees its matches in the
+    # same order as with the scalar rate_1vs1 path. Waves are numbered over
+    # the whole replay and stay valid for any run of consecutive events.
+    def __init__(self, events):
+        self.names = []
+        self.offsets = [0]
+        drawn = []
+        waves = []
+        last = {}
+        for _, _, tours in events:
+            for tour in tours:
+                for p1, p2, d, _, _ in tour:
+                    w1 = last.get(p1, -1)
+                    w2 = last.get(p2, -1)
+                    w = (w1 if w1 > w2 else w2) + 1
+                    last[p1] = last[p2] = w
+                    waves.append(w)
+                    drawn.append(d)
+                    self.names += (p1, p2)
+
+            self.offsets.append(len(waves))
+
+        self.drawn = np.array(drawn, dtype=bool)
+        self.waves = np.array(waves, dtype=np.int64)
+        self.dates = np.repeat([date.toordinal() for date, _, _ in events],
+                               np.diff(self.offsets))
+
+    @property
+    def width(self):
+        # Mean number of matches per wave
+        if not len(self.waves):
+            return 0
+
+        return len(self.waves) / (self.waves.max() + 1)
+
+    def rate(self, system, ratings, lo, hi, history=None):
+        # Rates events lo to hi, the kernel runs once per wave
+        start, end = self.offsets[lo], self.offsets[hi]
+        if start == end:
+            return
+
+        rows = ratings.rows(self.names[2 * start:2 * end])
+        waves = self.waves[start:end]
+        order = np.argsort(waves, kind='stable')
+        p1, p2 = rows[0::2][order], rows[1::2][order]
+        drawn = self.drawn[start:end][order]
+        dates = self.dates[start:end][order]
+
+        bounds = np.flatnonzero(np.diff(waves[order])) + 1
+        for s, e in zip([0] + bounds.tolist(), bounds.tolist() + [len(p1)]):
+            system.rate_batch(ratings, p1[s:e], p2[s:e], drawn[s:e],
+                              dates[s:e])
+
+            if history is not None:
+                for i1, i2, ordinal in zip(p1[s:e].tolist(),
+                                           p2[s:e].tolist(),
+                                           dates[s:e].tolist()):
+                    date = datetime.date.fromordinal(ordinal)
+                    history.record(ratings.keys[i1], RatingView(ratings, i1),
+                                   date)
+                    history.record(ratings.keys[i2], RatingView(ratings, i2),
+                                   date)
+
+
+def rate_period(system, ratings, matches, date=None, history=None):
+    # All matches of one rating period go to the kernel at once, players may
+    # repeat and are updated a single time.
+    if not matches:
+        return
+
+    p1, p2, drawn = zip(*((ratings.intern(p1), ratings.intern(p2), drawn)
+                          for p1, p2, drawn, _, _ in matches))
+    p1, p2, drawn = np.array(p1), np.array(p2), np.array(drawn)
+    system.rate_period(ratings, p1, p2, drawn,
+                       0 if date is None else date.toordinal())
+
+    if history is not None:
+        for i in np.unique(np.concatenate((p1, p2))):
+            history.record(ratings.keys[i], RatingView(ratings, i), date)
@@ -0,0 +1,210 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import http.server
+import urllib.parse
+import checkpoints as cp
+import game_types as gt
+import manifest as mf
+import match_store
+import threading
+import logging
+import datetime
+import glicko
+import json
+import glob
+import main
+import elo
+import os
+
+SYSTEMS = {'elo': elo, 'glicko': glicko}
+
+
+class RatingIndex:
+    # Ratings of every player under every system, with ranks overall and
+    # within the player's city, precomputed so lookups are dict accesses.
+    def __init__(self, engine, players, cur_date, systems=SYSTEMS):
+        self.players = players
+        self.cur_date = cur_date
+        self._entries = {}
+        self._tops = {}
+
+        cities = sorted(set(p.city for p in players.values()))
+        for system_name, system in systems.items():
+            entries = {}
+            result, latest_date = engine.rate_players(
+                cur_date,
+                players,
+                sep=engine.dates,
+                min_n=6,
+                filter_date=datetime.date(2020, 1, 1),
+                system=system)
+
+            for date, (rating, _) in zip(engine.dates + (latest_date, ),
+                                         result):
+                for pos, p, r, rd, _, _ in rating:
+                    entry = entries.setdefault(p.name, {
+                        'name': p.name,
+                        'display': p.display,
+                        'city': p.city,
+                        'history': []
+                    })
+                    entry['history'].append({
+                        'date': date.isoformat(),
+                        'rating': r,
+                        'rd': rd,
+                        'rank': pos
+                    })
+
+            tops = {None: []}
+            for pos, p, r, rd, _, _ in result[-1][0]:
+                entry = entries[p.name]
+                entry.update(rating=r, rd=rd, rank=pos, date=str(latest_date))
+                tops[None].append(entry)
+
+            for city in cities:
+                tops[city] = []
+                city_result, _ = engine.rate_players(
+                    cur_date,
+                    players,
+                    lambda p: p.city == city,
+                    min_n=6,
+                    filter_date=datetime.date(2020, 1, 1),
+                    system=system)
+                for pos, p, _, _, _, _ in city_result[-1][0]:
+                    entries[p.name]['city_rank'] = pos
+                    tops[city].append(entries[p.name])
+
+            self._entries[system_name] = entries
+            self._tops[system_name] = tops
+
+    def player(self, name, system='elo'):
+        player = self.players.resolve(name)
+        if player is None:
+            return None
+
+        return self._entries[system].get(player.name)
+
+    def top(self, system='elo', city=None, n=25):
+        return self._tops[system].get(city, [])[:n]
+
+
+class RatingService:
+    def __init__(self,
+                 tournaments_pattern='tournaments/*.csv',
+                 leagues_pattern='leagues/*.csv',
+                 registry=None,
+                 checkpoints=None):
+        self.tournaments_pattern = tournaments_pattern
+        self.leagues_pattern = leagues_pattern
+        self.registry = gt.Registry() if registry is None else registry
+        self.checkpoints = cp.Checkpoints(
+            depends=(self.registry.players_fname,
+                     self.registry.factions_fname)
+        ) if checkpoints is None else checkpoints
+        self.index = None
+        self._signature = None
+        self._lock = threading.Lock()
+
+    def _scan(self):
+        tournament_fnames = sorted(glob.glob(self.tournaments_pattern))
+        league_fnames = sorted(glob.glob(self.leagues_pattern))
+        signature = []
+        for fname in tournament_fnames + league_fnames + [
+                self.registry.players_fname, self.registry.factions_fname
+        ]:
+            st = os.stat(fname)
+            signature.append((fname, st.st_mtime_ns, st.st_size))
+
+        return tournament_fnames, league_fnames, signature
+
+    def refresh(self):
+        # New or changed files are the only ones parsed again (match store),
+        # and the replay resumes from the latest valid checkpoint.
+        with self._lock:
+            tournament_fnames, league_fnames, signature = self._scan()
+            if signature == self._signature:
+                return False
+
+            events = mf.Manifest.scan(tournament_fnames, league_fnames,
+                                      mf.MANIFEST_FNAME)
+            tournaments = gt.Tournaments()
+            match_store.load(tournaments,
+                             events.tournament_fnames,
+                             events.league_fnames,
+                             registry=self.registry)
+            engine = gt.RatingEngine(tournaments,
+                                     main.milestones(tournaments),
+                                     self.checkpoints)
+            self.index = RatingIndex(engine, self.registry.players,
+                                     main.commit_date())
+            self._signature = signature
+            return True
+
+    def watch(self, interval=60):
+        # A failed refresh (e.g. a broken CSV) keeps the previous index,
+        # the next one is tried after the interval.
+        def loop():
+            while not stop.wait(interval):
+                try:
+                    self.refresh()
+                except Exception:
+                    logging.exception('Rating refresh failed')
+
+        stop = threading.Event()
+        threading.Thread(target=loop, daemon=True).start()
+        return stop
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    # GET /player?name=Kamahl&system=glicko
+    # GET /top?system=elo&city=Msk&n=25
+    service = None
+
+    def do_GET(self):
+        url = urllib.parse.urlparse(self.path)
+        query = dict(urllib.parse.parse_qsl(url.query))
+        index = self.service.index
+        system = query.get('system', 'elo')
+        if system not in SYSTEMS:
+            return self._reply(400, {'error': 'Unknown system'})
+
+        if url.path == '/player':
+            entry = index.player(query.get('name', ''), system)
+            if entry is None:
+                return self._reply(404, {'error': 'Unknown player'})
+            return self._reply(200, entry)
+
+        if url.path == '/top':
+            try:
+                n = int(query.get('n', 25))
+            except ValueError:
+                return self._reply(400, {'error': 'Wrong n'})
+            if n < 0:
+                return self._reply(400, {'error': 'Wrong n'})
+            return self._reply(200, index.top(system, query.get('city'), n))
+
+        self._reply(404, {'error': 'Unknown request'})
+
+    def _reply(self, code, data):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def serve(host='127.0.0.1', port=8000, interval=60):
+    service = RatingService()
+    service.refresh()
+    service.watch(interval)
+
+    Handler.service = service
+    server = http.server.ThreadingHTTPServer((host, port), Handler)
+    print('Serving ratings on http://{}:{}'.format(host, port))
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    serve()
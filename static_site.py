@@ -0,0 +1,209 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import checkpoints as cp
+import game_types as gt
+import profiling as pf
+import main as mn
+import hashlib
+import html
+import json
+import sys
+import os
+
+SITE_DIR = 'site'
+HASHES_FNAME = '.hashes.json'
+INDEX_FNAME = 'all'
+HOME = 'https://pee-kay.github.io/russian-wu-rating'
+
+STYLE = ('table{border-collapse:collapse;margin-bottom:1em}'
+         'th,td{border:1px solid #ccc;padding:2px 6px;text-align:right}'
+         'td.text{text-align:left}')
+
+
+class SiteWriter:
+    # Writes the files of the site. A file with the same content hash as on
+    # the last build is left alone, the hashes are kept next to the pages.
+    def __init__(self, path=SITE_DIR):
+        self.path = path
+        self.written = 0
+        self.skipped = 0
+
+        if not os.path.exists(path):
+            os.makedirs(path)
+
+        self._hashes = {}
+        fname = os.path.join(path, HASHES_FNAME)
+        if os.path.exists(fname):
+            with open(fname) as f:
+                self._hashes = json.load(f)
+
+    def write(self, fname, text):
+        data = text.encode('utf-8')
+        digest = hashlib.sha1(data).hexdigest()
+        path = os.path.join(self.path, fname)
+        if self._hashes.get(fname) == digest and os.path.exists(path):
+            self.skipped += 1
+            return False
+
+        tmp_fname = path + '.tmp'
+        with open(tmp_fname, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_fname, path)
+        self._hashes[fname] = digest
+        self.written += 1
+        return True
+
+    def close(self):
+        fname = os.path.join(self.path, HASHES_FNAME)
+        with open(fname + '.tmp', 'w') as f:
+            json.dump(self._hashes, f, indent=1, sort_keys=True)
+        os.replace(fname + '.tmp', fname)
+
+
+def columns(renderer):
+    # Column names and whether the column holds text rather than a number
+    cols = [('#', False), (renderer.caption, True)]
+    if renderer.with_city:
+        cols.append(('City', True))
+    cols.append(('Rating', False))
+    if renderer.with_rd:
+        cols.append(('StD', False))
+    if renderer.with_diff:
+        cols.append(('+/-', False))
+
+    return cols
+
+
+def render_html(label, tables, notes):
+    e = html.escape
+    lines = [
+        '<!DOCTYPE html>', '<html lang="ru">', '<head>',
+        '<meta charset="utf-8">', '<title>{}</title>'.format(e(label)),
+        '<style>{}</style>'.format(STYLE), '</head>', '<body>',
+        '<p><a href="{}">К основным рейтингам</a></p>'.format(HOME)
+    ]
+
+    for title, renderer, rows, top in tables:
+        cols = columns(renderer)
+        lines += [
+            '<h1>{}</h1>'.format(e(title)), '<table>',
+            '<tr>' + ''.join('<th>{}</th>'.format(e(name))
+                             for name, _ in cols) + '</tr>'
+        ]
+        for cells in renderer.cells(rows, top):
+            lines.append('<tr>' + ''.join(
+                '<td class="text">{}</td>'.format(e(field)) if text else
+                '<td>{}</td>'.format(e(field.strip()))
+                for field, (_, text) in zip(renderer.fields(*cells), cols)) +
+                         '</tr>')
+        lines.append('</table>')
+
+    lines += ['<p>{}</p>'.format(e(note)) for note in notes]
+    lines += [
+        '<hr>', '<p><a href="{}">К основным рейтингам</a></p>'.format(HOME),
+        '</body>', '</html>'
+    ]
+
+    return '\n'.join(lines) + '\n'
+
+
+def render_json(label, tables, notes):
+    # Raw values for clients: rating and StD are not rounded, diff is None
+    # for a player new to the table
+    data = {'label': label, 'tables': [], 'notes': notes}
+    for title, renderer, rows, top in tables:
+        items = []
+        for pos, item, r, rd, diff_pos, _ in rows[:len(rows)
+                                                  if top is None else top]:
+            entry = {'place': pos, 'rating': None if r is None else float(r)}
+            if isinstance(item, str):
+                entry['name'] = item
+            else:
+                entry.update(name=item.display, player=item.name)
+                if renderer.with_city:
+                    entry['city'] = item.city
+            if renderer.with_rd:
+                entry['std'] = float(rd)
+            if renderer.with_diff:
+                entry['diff'] = diff_pos
+            items.append(entry)
+
+        data['tables'].append({
+            'title': title,
+            'caption': renderer.caption,
+            'rows': items
+        })
+
+    return json.dumps(data, ensure_ascii=False) + '\n'
+
+
+def render_index(pages):
+    lines = [
+        '<!DOCTYPE html>', '<html lang="ru">', '<head>',
+        '<meta charset="utf-8">', '<title>Все рейтинги</title>', '</head>',
+        '<body>', '<h1>Все рейтинги</h1>', '<ul>'
+    ]
+    lines += [
+        '<li><a href="{0}.html">{1}</a> (<a href="{0}.json">json</a>)</li>'.
+        format(stem, html.escape(label)) for stem, label in pages
+    ]
+    lines += [
+        '</ul>', '<p><a href="{}">К основным рейтингам</a></p>'.format(HOME),
+        '</body>', '</html>'
+    ]
+
+    return '\n'.join(lines) + '\n'
+
+
+def build(views, engine, players, cur_date, writer):
+    # Every view is rated from the shared replays of the engine and written
+    # as HTML and JSON straight from the rating tables
+    pages = []
+    for view in views:
+        fname, label, kwargs = mn.view_args(view)
+        stem = os.path.splitext(fname)[0]
+        with pf.stage('page ' + stem):
+            tables, notes = mn.rating_page(label, engine, players, cur_date,
+                                           **kwargs)
+
+            with pf.stage('render'):
+                page_html = render_html(label, tables, notes)
+                page_json = render_json(label, tables, notes)
+
+            with pf.stage('write'):
+                writer.write(stem + '.html', page_html)
+                writer.write(stem + '.json', page_json)
+
+        pages.append((stem, label))
+
+    writer.write(INDEX_FNAME + '.html', render_index(pages))
+
+
+def main():
+    # static_site.py [directory] [--profile] [--cprofile]
+    report, cprofile = pf.from_env(sys.argv[1:])
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    path = args[0] if args else SITE_DIR
+
+    cur_date = mn.commit_date()
+
+    with pf.stage('registry'):
+        registry = gt.Registry('players.csv', 'factions.csv')
+
+    tournaments = mn.load_tournaments(registry)
+    engine = gt.RatingEngine(tournaments, mn.milestones(tournaments),
+                             cp.Checkpoints())
+
+    writer = SiteWriter(path)
+    build(mn.VIEWS, engine, registry.players, cur_date, writer)
+    writer.close()
+    print('{} files written, {} unchanged, {} rating replays'.format(
+        writer.written, writer.skipped, engine.replay_count))
+
+    if report:
+        pf.PROFILER.report(report, cprofile)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,15 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import game_types as gt
+
+
+@pytest.fixture
+def registry():
+    return gt.Registry(os.path.join(ROOT, 'players.csv'),
+                       os.path.join(ROOT, 'factions.csv'))
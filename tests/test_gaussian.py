@@ -0,0 +1,23 @@
+import math
+
+import numpy as np
+import pytest
+
+import gaussian
+
+
+def test_erfc_matches_math():
+    x = np.concatenate((np.linspace(-30, 30, 60001),
+                        (0.0, 0.46875, -0.46875, 4.0, -4.0,
+                         gaussian.ERFC_MAX, -gaussian.ERFC_MAX, np.inf,
+                         -np.inf)))
+    expected = np.array([math.erfc(v) for v in x])
+    got = gaussian.erfc(x)
+
+    # Beyond about 26 erfc is subnormal, only its absolute error matters
+    normal = expected > 1e-300
+    assert np.all(
+        np.abs(got[normal] - expected[normal]) <= 2e-15 * expected[normal])
+    assert np.all(np.abs(got - expected) < 1e-300 + 1e-15)
+    assert np.isnan(gaussian.erfc(np.nan))
+    assert gaussian.erfc(0.3) == pytest.approx(math.erfc(0.3), rel=1e-15)
@@ -0,0 +1,58 @@
+import datetime
+import random
+
+import pytest
+
+import history as hs
+
+START = datetime.date(2018, 1, 1)
+
+
+def brute_at(entries, date):
+    found = None
+    for entry in entries:
+        if entry[0] <= date:
+            found = entry
+
+    return found
+
+
+def test_timeline_at():
+    # Several changes a day and long gaps, over many blocks
+    rnd = random.Random(3)
+    timeline = hs.Timeline()
+    entries = []
+    date = START
+    for i in range(10 * hs.BLOCK + 5):
+        date += datetime.timedelta(rnd.choice((0, 0, 1, 3, 40)))
+        entries.append((date, 1500.0 + i, float(i)))
+        timeline.append(*entries[-1])
+
+    assert len(timeline) == len(entries)
+    assert list(timeline) == entries
+    for day in range((entries[-1][0] - START).days + 3):
+        d = START + datetime.timedelta(day - 1)
+        assert timeline.at(d) == brute_at(entries, d)
+
+
+def test_timeline_same_day_across_blocks():
+    timeline = hs.Timeline()
+    for i in range(2 * hs.BLOCK):
+        timeline.append(START, float(i))
+
+    assert timeline.at(START) == (START, 2.0 * hs.BLOCK - 1, 0.0)
+
+
+def test_timeline_order():
+    timeline = hs.Timeline()
+    for i in range(hs.BLOCK):
+        timeline.append(START + datetime.timedelta(i), float(i))
+
+    # The next entry starts a block, it is checked all the same
+    with pytest.raises(ValueError):
+        timeline.append(START, 0.0)
+    with pytest.raises(ValueError):
+        timeline.append(START + datetime.timedelta(hs.BLOCK - 2), 0.0)
+
+    timeline.append(START + datetime.timedelta(hs.BLOCK - 1), 1.0)
+    assert len(timeline) == hs.BLOCK + 1
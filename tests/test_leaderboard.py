@@ -0,0 +1,27 @@
+import random
+
+import leaderboard as lb
+
+
+def test_leaderboard_sorted():
+    rnd = random.Random(2)
+    board = lb.Leaderboard()
+    keys = {}
+    for step in range(50):
+        for _ in range(rnd.randint(0, 40)):
+            name = 'p{}'.format(rnd.randrange(100))
+            if name in keys and rnd.random() < 0.1:
+                board.remove(name)
+                del keys[name]
+            else:
+                # Few distinct keys, so ties are broken by the name
+                keys[name] = (rnd.choice((0, -1400.0, -1500.0,
+                                          -rnd.uniform(1000, 2000))),
+                              'Player {}'.format(rnd.randrange(5)))
+                board.update(name, keys[name])
+
+        assert len(board) == len(keys)
+        assert all(name in board for name in keys)
+        assert list(board) == [
+            name for name in sorted(keys, key=lambda n: keys[n] + (n, ))
+        ]
@@ -0,0 +1,30 @@
+import glob
+import os
+
+import manifest as mf
+from conftest import ROOT
+
+
+def test_scan_order():
+    # Same-date tournaments load in file name order
+    fnames = sorted(glob.glob(os.path.join(ROOT, 'tournaments', '*.csv')))
+    events = mf.Manifest.scan(fnames, [])
+    reverse = mf.Manifest.scan(fnames[::-1], [])
+
+    assert events.tournament_fnames == reverse.tournament_fnames
+    assert [(e.date, e.fname) for e in events] == sorted(
+        (e.date, e.fname) for e in events)
+
+
+def test_select():
+    fnames = sorted(glob.glob(os.path.join(ROOT, 'tournaments', '*.csv')))
+    events = mf.Manifest.scan(fnames, [])
+    since = events[len(events) // 2].date
+
+    glass = events.select(min_rank=2)
+    assert glass and all(e.with_glass for e in glass)
+    assert [e.fname for e in events.select(since=since)] == [
+        e.fname for e in events if e.date >= since
+    ]
+    assert events.select(tourney_check=lambda e: e.org == events[0].org,
+                         city=events[0].city)[0] is events[0]
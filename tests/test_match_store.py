@@ -0,0 +1,73 @@
+import glob
+import os
+import shutil
+
+import checkpoints as cp
+import game_types as gt
+import match_store
+from conftest import ROOT
+
+
+def test_store_round_trip(tmp_path, registry):
+    tournament_fnames = sorted(glob.glob(os.path.join(ROOT, 'tournaments',
+                                                      '*.csv')))
+    league_fnames = sorted(glob.glob(os.path.join(ROOT, 'leagues', '*.csv')))
+    fnames = tournament_fnames + league_fnames
+    records = gt.parse_all(tournament_fnames,
+                           league_fnames,
+                           registry=registry,
+                           workers=1)
+
+    fname = str(tmp_path / 'matches.bin')
+    match_store.write_store(fname, records, fnames, ['players', 'factions'])
+
+    with match_store.MatchStore(fname) as store:
+        assert store.depends == ['players', 'factions']
+        assert len(store) == len(fnames)
+        assert [store.source(e)[0] for e in range(len(store))] == fnames
+        assert [store.record(e) for e in range(len(store))] == records
+
+
+def test_load_from_store(tmp_path, registry):
+    tournament_fnames = sorted(glob.glob(os.path.join(ROOT, 'tournaments',
+                                                      '*.csv')))
+    league_fnames = sorted(glob.glob(os.path.join(ROOT, 'leagues', '*.csv')))
+    fname = str(tmp_path / 'matches.bin')
+
+    parsed = gt.Tournaments()
+    match_store.load(parsed, tournament_fnames, league_fnames, fname,
+                     registry, workers=1)
+    assert os.path.exists(fname)
+
+    stored = gt.Tournaments()
+    match_store.load(stored, tournament_fnames, league_fnames, fname,
+                     registry, workers=1)
+
+    assert [(t.name, t.date, t.source_hash, list(t.iter_matches()))
+            for t in stored] == [(t.name, t.date, t.source_hash,
+                                  list(t.iter_matches())) for t in parsed]
+
+
+def test_load_selected(tmp_path, registry):
+    # Loading a few events keeps the records of the others in the store
+    (tmp_path / 'tournaments').mkdir()
+    for f in glob.glob(os.path.join(ROOT, 'tournaments', '*.csv')):
+        shutil.copy(f, str(tmp_path / 'tournaments'))
+    fnames = sorted(glob.glob(str(tmp_path / 'tournaments' / '*.csv')))
+    fname = str(tmp_path / 'matches.bin')
+    match_store.load(gt.Tournaments(), fnames, (), fname, registry, workers=1)
+
+    # A changed file makes the selected load write the store
+    old_hash = cp.file_hash(fnames[0])
+    with open(fnames[0], newline='') as f:
+        text = f.read()
+    with open(fnames[0], 'w', newline='') as f:
+        f.write(text.replace('\r\n', '\n').replace('\n', '\r\n'))
+    selected = gt.Tournaments()
+    match_store.load(selected, fnames[:3], (), fname, registry, workers=1)
+    assert len(selected) == 3
+
+    with match_store.MatchStore(fname) as store:
+        sources = dict(store.source(e) for e in range(len(store)))
+    assert sorted(sources) == fnames
+    assert sources[fnames[0]] == cp.file_hash(fnames[0]) != old_hash
@@ -0,0 +1,36 @@
+import game_types as gt
+
+CAPTION = ',Nick,Faction,T,VP,GP,Diff,T,VP,GP,Diff\n'
+
+
+def write_tournament(tmp_path, rows):
+    fname = tmp_path / "(2020, 2, 1), 'Test', 'Org', 'Msk', 'LT'.csv"
+    fname.write_text(CAPTION + ''.join(rows))
+    return str(fname)
+
+
+def test_parse_tournament(tmp_path, registry):
+    fname = write_tournament(tmp_path, [
+        '1,Kamahl,Liberators,1,3,10,2,2,0,5,-6\n',
+        '2,Imp,Liberators,1,0,6,1,1,3,11,6\n',
+        '3,Barb,Reavers,2,3,7,7,1,0,2,-10\n',
+        '4,Kifir,Death,2,0,2,-9,2,3,10,1\n',
+    ])
+
+    kind, params, players, factions, matches, _ = gt.parse_tournament(
+        fname, registry)
+
+    assert kind == 'tournament'
+    assert params == ((2020, 2, 1), 'Test', 'Org', 'Msk', 'LT')
+    assert players[1] == 'Kamahl'
+    assert factions[3] == registry.factions['reavers'].name
+    assert matches == [[(1, 2, 1), (3, 4, 1)], [(2, 3, 1), (1, 4, -1)]]
+
+
+def test_parse_tournament_only_proxies(tmp_path, registry):
+    fname = write_tournament(tmp_path, [
+        '1,Proxy,Liberators,1,3,10,2,1,3,10,2\n',
+        '2,Proxy,Reavers,1,0,6,1,1,0,6,1\n',
+    ])
+
+    assert gt.parse_tournament(fname, registry)[4] == [[], []]
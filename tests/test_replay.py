@@ -0,0 +1,155 @@
+import bisect
+import datetime
+import glob
+import os
+
+import numpy as np
+import pytest
+
+import checkpoints as cp
+import game_types as gt
+import rating_table as rt
+import glicko_period
+import gaussian
+import glicko2
+import glicko
+import winrate
+import elo
+from conftest import ROOT
+
+SYSTEMS = (elo, glicko, glicko_period, glicko2, gaussian, winrate)
+DATES = (datetime.date(2019, 1, 1), datetime.date(2019, 7, 1))
+
+
+@pytest.fixture
+def tourneys(registry):
+    tournaments = gt.Tournaments()
+    tournaments.load_all(
+        sorted(glob.glob(os.path.join(ROOT, 'tournaments', '*.csv'))),
+        sorted(glob.glob(os.path.join(ROOT, 'leagues', '*.csv'))),
+        registry=registry,
+        workers=1)
+
+    return tournaments.chronological()
+
+
+def assert_same(batch, scalar):
+    assert list(batch) == list(scalar)
+    for p, r in scalar.items():
+        b = batch[p]
+        assert b.n == r.n
+        assert b.last_active == r.last_active
+        assert b.mu == pytest.approx(r.mu, rel=1e-9)
+        for attr in ('rdSq', 'sigma'):
+            if hasattr(r, attr):
+                assert getattr(b, attr) == pytest.approx(getattr(r, attr),
+                                                         rel=1e-9)
+
+
+@pytest.mark.parametrize('system', SYSTEMS, ids=lambda s: s.__name__)
+def test_batch_matches_scalar(tourneys, system, monkeypatch):
+    # The real data has narrow waves, the batch kernels are forced on
+    monkeypatch.setattr(rt, 'MIN_WAVE', 0)
+    batch = gt.replay(tourneys, system, DATES, batch=True)
+    scalar = gt.replay(tourneys, system, DATES, batch=False)
+
+    assert len(batch) == len(scalar) == len(DATES) + 1
+    for (b, _), (r, _) in zip(batch, scalar):
+        assert_same(b, r)
+
+
+@pytest.mark.parametrize('system', (glicko, glicko_period),
+                         ids=lambda s: s.__name__)
+def test_checkpointed_tables(tmp_path, tourneys, system, monkeypatch):
+    # Tables are saved as they are and thawed by a later replay
+    monkeypatch.setattr(rt, 'MIN_WAVE', 0)
+    checkpoints = cp.Checkpoints(str(tmp_path),
+                                 (os.path.join(ROOT, 'players.csv'),
+                                  os.path.join(ROOT, 'factions.csv')))
+    scalar = gt.replay(tourneys, system, DATES, batch=False)
+    saved = gt.replay(tourneys, system, DATES, checkpoints=checkpoints)
+    loaded = gt.replay(tourneys + tourneys[-1:],
+                       system,
+                       DATES,
+                       checkpoints=checkpoints)
+
+    assert isinstance(saved[-1][0], rt.RatingTable)
+    for (s, _), (r, _) in zip(saved, scalar):
+        assert_same(s, r)
+    for (s, _), (r, _) in zip(loaded[:-1], scalar[:-1]):
+        assert_same(s, r)
+    assert sum(r.n for _, r in loaded[-1][0].items()) > sum(
+        r.n for _, r in scalar[-1][0].items())
+
+
+def test_schedule_waves(tourneys):
+    events = gt.merge_events(tourneys)
+    schedule = rt.Schedule(events)
+    names = np.array(schedule.names).reshape(-1, 2)
+
+    assert schedule.offsets[-1] == len(schedule.waves) == len(names)
+    for w in range(schedule.waves.max() + 1):
+        players = names[schedule.waves == w].ravel()
+        assert len(set(players)) == len(players)
+
+    # Matches of a player keep their order
+    last = {}
+    for (p1, p2), w in zip(names, schedule.waves):
+        assert last.get(p1, -1) < w and last.get(p2, -1) < w
+        last[p1] = last[p2] = w
+
+
+@pytest.mark.parametrize('system', (elo, glicko), ids=lambda s: s.__name__)
+def test_window_matches_slices(tmp_path, tourneys, system):
+    dates = gt.schedule(datetime.date(2018, 1, 1), datetime.date(2020, 8, 1),
+                        1)
+    events = gt.merge_events(tourneys)
+    event_dates = [e[0] for e in events]
+    ends = list(dates) + [event_dates[-1] + datetime.timedelta(1)]
+    expected = []
+    for end in ends:
+        lo = bisect.bisect_left(event_dates, gt.shift_months(end, -12))
+        hi = bisect.bisect_left(event_dates, end)
+        expected.append(gt.replay_events(events[lo:hi], system)[-1])
+
+    checkpoints = cp.Checkpoints(str(tmp_path),
+                                 (os.path.join(ROOT, 'players.csv'),
+                                  os.path.join(ROOT, 'factions.csv')))
+    for _ in range(2):
+        # The second run loads the windows from checkpoints
+        snapshots = gt.replay_window(tourneys, system, dates, 12,
+                                     checkpoints=checkpoints)
+        assert len(snapshots) == len(expected)
+        for (s, _), (r, _) in zip(snapshots, expected):
+            assert_same(s, r)
+
+
+def test_periods_reject_factions(tourneys):
+    with pytest.raises(ValueError):
+        gt.replay(tourneys, glicko_period, DATES, with_factions=True)
+    with pytest.raises(ValueError):
+        gt.replay(tourneys[:0], glicko_period, with_factions=True)
+
+
+def test_glicko2_factions(tourneys):
+    ratings, faction_ratings = gt.replay(tourneys, glicko2,
+                                         with_factions=True)[-1]
+    assert faction_ratings and all(r.n > 0 for r in faction_ratings.values())
+
+    with pytest.raises(ValueError):
+        gt.replay(tourneys, glicko, with_factions=True)
+
+
+def test_glicko2_team_of_neutral_factions():
+    # Settled factions at 1500 leave a plain game between the players
+    r1 = glicko2.Rating(1600.0, 5, 120.0**2)
+    r2 = glicko2.Rating(1450.0, 3, 200.0**2)
+    f = glicko2.Rating(1500.0, 100, 0.0)
+    for drawn in (False, True):
+        n1, n2, f1, f2 = glicko2.rate_2vs2(r1, r2, f, f, drawn)
+        e1, e2 = glicko2.rate_1vs1(r1, r2, drawn)
+        for a, b in ((n1, e1), (n2, e2)):
+            assert (a.mu, a.rdSq, a.sigma) == pytest.approx(
+                (b.mu, b.rdSq, b.sigma))
+
+        assert f1.mu > f2.mu or drawn
@@ -0,0 +1,54 @@
+import http.server
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+import service
+
+
+class Index:
+    def __init__(self, names):
+        self.names = names
+
+    def player(self, name, system):
+        return {'name': name} if name in self.names else None
+
+    def top(self, system='elo', city=None, n=25):
+        return self.names[:n]
+
+
+@pytest.fixture
+def url():
+    handler = type('Handler', (service.Handler, ), {
+        'service': type('Service', (), {'index': Index(['a', 'b', 'c'])}),
+        'log_message': lambda self, *args: None
+    })
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield 'http://127.0.0.1:{}'.format(server.server_address[1])
+    server.shutdown()
+    server.server_close()
+
+
+def get(url):
+    try:
+        with urllib.request.urlopen(url) as f:
+            return f.status, json.load(f)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+
+def test_top(url):
+    assert get(url + '/top?n=2') == (200, ['a', 'b'])
+    assert get(url + '/top?n=0') == (200, [])
+    assert get(url + '/top?n=-2')[0] == 400
+    assert get(url + '/top?n=x')[0] == 400
+
+
+def test_player(url):
+    assert get(url + '/player?name=a') == (200, {'name': 'a'})
+    assert get(url + '/player?name=z')[0] == 404
+    assert get(url + '/player?name=a&system=none')[0] == 400
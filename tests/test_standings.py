@@ -0,0 +1,67 @@
+import datetime
+import random
+
+import pytest
+
+import game_types as gt
+import rating_table as rt
+import glicko
+import elo
+
+DATE = datetime.date(2020, 1, 1)
+
+
+def expected_order(standings, ratings, date):
+    def key(p):
+        r = ratings[p]
+        ok = standings.check_rating(r, date)
+        return (-r.mu if ok else 0, standings.players[p].display, p)
+
+    return sorted((p for p in ratings if standings.include(p)), key=key)
+
+
+@pytest.mark.parametrize('system', (elo, glicko), ids=lambda s: s.__name__)
+@pytest.mark.parametrize('tabular', (False, True))
+def test_standings_sorted(system, tabular):
+    rnd = random.Random(1)
+    players = {
+        'p{}'.format(i): gt.Player('p{}'.format(i),
+                                   display='Player {}'.format(i % 7),
+                                   hidden=i % 11 == 0)
+        for i in range(60)
+    }
+    standings = gt.Standings(players,
+                             system=system,
+                             min_n=3,
+                             filter_date=DATE + datetime.timedelta(90))
+
+    ratings = {}
+    for step in range(8):
+        date = DATE + datetime.timedelta(30 * step)
+        for p in rnd.sample(sorted(players), 20):
+            # Equal ratings share a position
+            r = system.Rating(rnd.choice((1400.0, 1500.0, 1600.0,
+                                          rnd.gauss(1500, 200))),
+                              rnd.randint(0, 6),
+                              date=date - datetime.timedelta(
+                                  rnd.randint(0, 400)))
+            if hasattr(r, 'rdSq'):
+                r.rdSq = rnd.uniform(50, 300)**2
+            ratings[p] = r
+
+        snapshot = (rt.RatingTable.from_ratings(system, ratings)
+                    if tabular else dict(ratings))
+        standings.separate(date, snapshot)
+
+        table = standings.result[-1][0]
+        order = expected_order(standings, ratings, date)
+        assert [row[1].name for row in table] == order
+
+        for i, (pos, player, rating, _, _, _) in enumerate(table):
+            r = ratings[player.name]
+            assert rating == (r.mu if standings.check_rating(r, date) else
+                              None)
+            if i and rating == table[i - 1][2]:
+                assert pos == table[i - 1][0]
+            else:
+                assert pos == i + 1
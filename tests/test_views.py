@@ -0,0 +1,57 @@
+import glob
+import os
+import types
+
+import pytest
+
+import game_types as gt
+import main
+from conftest import ROOT
+
+
+@pytest.fixture
+def tournaments(registry):
+    tournaments = gt.Tournaments()
+    tournaments.load_all(
+        sorted(glob.glob(os.path.join(ROOT, 'tournaments', '*.csv'))),
+        sorted(glob.glob(os.path.join(ROOT, 'leagues', '*.csv'))),
+        registry=registry,
+        workers=1)
+
+    return tournaments
+
+
+def test_milestones_follow_events(tournaments):
+    milestones = main.milestones(tournaments)
+    last = max(t.date for t in tournaments)
+
+    assert milestones[0] == main.MILESTONES_START
+    assert milestones[-1] <= last < gt.shift_months(milestones[-1], 3)
+
+    # An event in the next quarter adds its milestone
+    later = types.SimpleNamespace(date=gt.shift_months(milestones[-1], 3))
+    assert main.milestones(list(tournaments) +
+                           [later]) == milestones + (later.date, )
+
+
+def test_window_view(tmp_path, tournaments, registry):
+    engine = gt.RatingEngine(tournaments, main.milestones(tournaments))
+    cur_date = max(t.date for t in tournaments)
+    view = dict(fname='last-year.md',
+                label='Last year',
+                with_milestones=True,
+                window=12)
+    main.export_view(view, engine, registry.players, cur_date,
+                     str(tmp_path))
+
+    assert (tmp_path / 'last-year.md').exists()
+    tables, _ = main.rating_page('Last year', engine, registry.players,
+                                 cur_date,
+                                 with_milestones=True,
+                                 window=12)
+    full, _ = main.rating_page('Last year', engine, registry.players,
+                               cur_date,
+                               with_milestones=True)
+    assert len(tables) == len(full) == len(engine.dates) + 1
+    # Players without matches in the last year drop out of the latest table
+    assert len(tables[0][2]) < len(full[0][2])
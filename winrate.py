@@ -1,4 +1,8 @@
+import numpy as np
+
 class Rating:
+    __slots__ = ('mu', 'n', 'last_active')
+
     def __init__(self):
         self.mu = 0.0
         self.n = 0
@@ -15,4 +19,10 @@ def rate_1vs1(r1, r2, drawn = False, date = None):
     new_r2.mu = r2.mu * r2.n / new_r2.n
     new_r2.last_active = date
 
-    return (new_r1, new_r2)
\ No newline at end of file
+    return (new_r1, new_r2)
+def expected(mu1, mu2, rd1Sq = None, rd2Sq = None):
+    # log5 estimate from the two win rates, even odds when it's undefined
+    a = mu1 * (1 - mu2)
+    b = mu2 * (1 - mu1)
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        return np.where(a + b > 0, a / (a + b), 0.5)